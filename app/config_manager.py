@@ -1,20 +1,56 @@
 """Configuration management"""
+import copy
 import os
+import tempfile
+import threading
 import yaml
 import logging
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
 
+# Prefer the libyaml C bindings; fall back to the pure-Python implementation
+# when PyYAML was built without libyaml
+try:
+    from yaml import CSafeLoader as _Loader, CSafeDumper as _Dumper
+except ImportError:
+    from yaml import SafeLoader as _Loader, SafeDumper as _Dumper
+
+try:
+    import orjson
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:
+    import json
+    _loads = json.loads
+
+    def _dumps(obj):
+        return json.dumps(obj).encode('utf-8')
+
 logger = logging.getLogger(__name__)
 
-# ISO format strings for robust datetime parsing
-ISO_FORMATS = (
-    "%Y-%m-%dT%H:%M:%S.%fZ",
-    "%Y-%m-%dT%H:%M:%SZ",
-    "%Y-%m-%dT%H:%M:%S.%f%z",
-    "%Y-%m-%dT%H:%M:%S%z",
-    "%Y-%m-%d",  # date only without time
-)
+# Config keys never handed out through safe_config
+_SENSITIVE_KEYS = {
+    'trakt': ('client_secret', 'access_token', 'refresh_token'),
+    'letterboxd': ('password',),
+    'web': ('admin_password', 'secret_key'),
+}
+
+@lru_cache(maxsize=4096)
+def _parse_dt_str(value):
+    """Parse an ISO 8601 string into a UTC-aware datetime (cached)."""
+    s = value.strip()
+    # Normalize trailing 'Z' to an explicit UTC offset
+    if s.endswith("Z"):
+        s = s[:-1] + "+00:00"
+    try:
+        dt = datetime.fromisoformat(s)
+    except ValueError:
+        return None
+    # Zero-offset inputs (including normalized 'Z') already carry the UTC singleton
+    if dt.tzinfo is timezone.utc:
+        return dt
+    return dt.astimezone(timezone.utc) if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
 
 def parse_dt(value):
     """Parse str|datetime|None and return datetime|None (UTC-aware)."""
@@ -23,34 +59,29 @@ def parse_dt(value):
     if isinstance(value, datetime):
         return value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
     if isinstance(value, str):
-        s = value.strip()
-        # Convert 'Z' to %z-compliant format
-        s_z = s.replace("Z", "+00:00") if s.endswith("Z") else s
-        # Try fromisoformat first
-        try:
-            dt = datetime.fromisoformat(s_z)
-            return dt.astimezone(timezone.utc) if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
-        except Exception:
-            pass
-        # Fallback: try known formats
-        for fmt in ISO_FORMATS:
-            try:
-                if fmt.endswith("%z"):
-                    dt = datetime.strptime(s_z, fmt)
-                else:
-                    dt = datetime.strptime(s, fmt)
-                return dt.astimezone(timezone.utc) if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
-            except Exception:
-                continue
+        return _parse_dt_str(value)
     # Unknown format
     return None
 
 def save_dt(path, dt):
-    """Save datetime to file in consistent ISO 8601 format with Z."""
-    dtu = parse_dt(dt) or datetime.now(timezone.utc)
-    # Consistent ISO 8601 with Z
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(dtu.astimezone(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z"))
+    """Atomically save datetime to file in consistent ISO 8601 format with Z."""
+    if isinstance(dt, datetime):
+        dtu = dt.astimezone(timezone.utc) if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+    else:
+        dtu = parse_dt(dt) or datetime.now(timezone.utc)
+    # Write to a sibling temp file and swap it in so readers never see a partial file
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(dtu.strftime("%Y-%m-%dT%H:%M:%SZ"))
+    os.replace(tmp_path, path)
+
+
+def _flatten(node, prefix, out):
+    """Index every subtree and leaf of a nested dict under its key-path tuple."""
+    out[prefix] = node
+    if isinstance(node, dict):
+        for key, value in node.items():
+            _flatten(value, prefix + (key,), out)
 
 
 class ConfigManager:
@@ -58,16 +89,60 @@ class ConfigManager:
 
     def __init__(self, config_path="config/config.yaml"):
         self.config_path = config_path
+        self._cache_path = config_path + '.cache'
+        # Unsaved changes and open batch depth (see __enter__/__exit__). The
+        # lock is held for a whole batch, so set() from another thread waits
+        # for it instead of being deferred into (or flushed by) that batch.
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._transaction_depth = 0
+        # (path, st_mtime_ns, datetime) of the last sync file read
+        self._last_sync_cache = None
+        # Redacted copy of the config, built on first use (see safe_config)
+        self._safe_config = None
         self.config = self._load_config()
+        self._rebuild_index()
         self._ensure_directories()
 
+    def __enter__(self):
+        """Batch set() calls into a single save when the block exits"""
+        self._lock.acquire()
+        self._transaction_depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                self.flush()
+        finally:
+            self._lock.release()
+        return False
+
+    def flush(self):
+        """Save configuration if there are unsaved changes"""
+        with self._lock:
+            if self._dirty:
+                return self.save_config()
+            return True
+
     def _load_config(self):
-        """Load configuration from YAML file"""
+        """Load configuration from the JSON cache if fresh, else from YAML"""
+        try:
+            source = os.stat(self.config_path)
+        except OSError:
+            source = None
+
+        config = self._load_cached_config(source) if source else None
+        if config is not None:
+            return config
+
         try:
             with open(self.config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
+                config = yaml.load(f, Loader=_Loader)
                 logger.info(f"Configuration loaded from {self.config_path}")
-                return config
+            self._write_config_cache(config, source)
+            return config
         except FileNotFoundError:
             logger.warning(f"Config file not found at {self.config_path}")
             return self._get_default_config()
@@ -75,6 +150,52 @@ class ConfigManager:
             logger.error(f"Error loading config: {e}")
             return self._get_default_config()
 
+    def _load_cached_config(self, source):
+        """Return the cached config if it was built from exactly this YAML file"""
+        try:
+            with open(self._cache_path, 'rb') as f:
+                cached = _loads(f.read())
+            # Exact match on mtime and size, so a YAML file swapped in with
+            # an older timestamp (cp -p, restored backup) still invalidates it
+            if cached.get('source') != [source.st_mtime_ns, source.st_size]:
+                return None
+            logger.info(f"Configuration loaded from cache {self._cache_path}")
+            return cached['config']
+        except Exception:
+            # Missing, stale or unreadable cache - fall back to YAML
+            return None
+
+    def _write_config_cache(self, config, source):
+        """Atomically write the JSON config cache next to the YAML file"""
+        try:
+            data = _dumps({'source': [source.st_mtime_ns, source.st_size], 'config': config})
+            # Only cache configs that survive the JSON round trip unchanged
+            # (e.g. an unquoted YAML date would come back as a string)
+            if _loads(data)['config'] != config:
+                return
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(os.path.abspath(self._cache_path)),
+                prefix='.config-cache-'
+            )
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, self._cache_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except Exception as e:
+            logger.debug(f"Could not write config cache: {e}")
+
+    def _invalidate_config_cache(self):
+        """Remove the JSON config cache"""
+        try:
+            os.unlink(self._cache_path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.debug(f"Could not remove config cache: {e}")
+
     def _get_default_config(self):
         """Return default configuration"""
         return {
@@ -93,7 +214,8 @@ class ConfigManager:
             'letterboxd': {
                 'auto_upload': False,
                 'username': os.getenv('LETTERBOXD_USERNAME', ''),
-                'password': os.getenv('LETTERBOXD_PASSWORD', '')
+                'password': os.getenv('LETTERBOXD_PASSWORD', ''),
+                'upload_workers': 4
             },
             'sync': {
                 'schedule': '0 2 * * *',
@@ -104,6 +226,7 @@ class ConfigManager:
             'web': {
                 'host': '0.0.0.0',
                 'port': 5000,
+                'threads': 8,
                 'admin_password': 'changeme'
             },
             'logging': {
@@ -114,6 +237,19 @@ class ConfigManager:
             }
         }
 
+    @property
+    def safe_config(self):
+        """Deep copy of the configuration without sensitive data (cached until the next change)"""
+        with self._lock:
+            if self._safe_config is None:
+                safe_config = copy.deepcopy(self.config)
+                for section, keys in _SENSITIVE_KEYS.items():
+                    if isinstance(safe_config.get(section), dict):
+                        for key in keys:
+                            safe_config[section].pop(key, None)
+                self._safe_config = safe_config
+            return self._safe_config
+
     def _ensure_directories(self):
         """Ensure required directories exist"""
         directories = [
@@ -126,48 +262,81 @@ class ConfigManager:
 
     def save_config(self):
         """Save configuration to YAML file"""
-        try:
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                yaml.dump(self.config, f, default_flow_style=False)
-                logger.info(f"Configuration saved to {self.config_path}")
+        with self._lock:
+            self._safe_config = None
+            self._invalidate_config_cache()
+            try:
+                with open(self.config_path, 'w', encoding='utf-8') as f:
+                    yaml.dump(self.config, f, Dumper=_Dumper, default_flow_style=False)
+                    logger.info(f"Configuration saved to {self.config_path}")
+                self._write_config_cache(self.config, os.stat(self.config_path))
+                self._dirty = False
                 return True
-        except Exception as e:
-            logger.error(f"Error saving config: {e}")
-            return False
+            except Exception as e:
+                logger.error(f"Error saving config: {e}")
+                return False
+
+    def _rebuild_index(self):
+        """Rebuild the flat key-path index used by get()"""
+        # Built aside and swapped in so lock-free get() never sees a partial index
+        flat = {}
+        _flatten(self.config, (), flat)
+        self._flat = flat
 
     def get(self, *keys, default=None):
         """Get nested configuration value"""
-        value = self.config
-        for key in keys:
-            if isinstance(value, dict):
-                value = value.get(key)
-                if value is None:
-                    return default
-            else:
-                return default
-        return value
+        value = self._flat.get(keys)
+        return default if value is None else value
 
     def set(self, *keys, value):
         """Set nested configuration value"""
-        config = self.config
-        for key in keys[:-1]:
-            if key not in config:
-                config[key] = {}
-            config = config[key]
-        config[keys[-1]] = value
-        self.save_config()
+        with self._lock:
+            config = self.config
+            for key in keys[:-1]:
+                if key not in config:
+                    config[key] = {}
+                config = config[key]
+            config[keys[-1]] = value
+            self._safe_config = None
+            self._rebuild_index()
+            self._dirty = True
+            if not self._transaction_depth:
+                self.save_config()
+
+    def update(self, updates):
+        """
+        Merge several configuration values and save once
+
+        Args:
+            updates: Mapping of section name to a dict of keys to set in it
+        """
+        with self._lock:
+            for section, values in updates.items():
+                self.config.setdefault(section, {}).update(values)
+            self._safe_config = None
+            self._rebuild_index()
+            self._dirty = True
+            if not self._transaction_depth:
+                self.save_config()
 
     def get_last_sync_time(self):
-        """Get the last sync timestamp"""
+        """Get the last sync timestamp (re-read only when the file changes)"""
         last_sync_file = self.config['sync']['last_sync_file']
         try:
-            if os.path.exists(last_sync_file):
-                with open(last_sync_file, 'r', encoding='utf-8') as f:
-                    timestamp_str = f.read()
-                    dt = parse_dt(timestamp_str)
-                    if dt:
-                        logger.debug(f"Loaded last sync time: {dt}")
-                        return dt
+            mtime = os.stat(last_sync_file).st_mtime_ns
+            cached = self._last_sync_cache
+            if cached and cached[0] == last_sync_file and cached[1] == mtime:
+                return cached[2]
+
+            with open(last_sync_file, 'r', encoding='utf-8') as f:
+                timestamp_str = f.read()
+            dt = parse_dt(timestamp_str)
+            self._last_sync_cache = (last_sync_file, mtime, dt)
+            if dt:
+                logger.debug(f"Loaded last sync time: {dt}")
+                return dt
+        except FileNotFoundError:
+            pass
         except Exception as e:
             logger.error(f"Error reading last sync time: {e}")
         return None
@@ -177,6 +346,8 @@ class ConfigManager:
         last_sync_file = self.config['sync']['last_sync_file']
         try:
             save_dt(last_sync_file, timestamp or datetime.now(timezone.utc))
+            # Don't rely on mtime resolution to notice our own write
+            self._last_sync_cache = None
             logger.info(f"Last sync time updated: {timestamp or 'now'}")
             return True
         except Exception as e:
@@ -0,0 +1,106 @@
+"""Shared HTTP session configuration"""
+import threading
+from collections import OrderedDict
+from requests import Session
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+# Transient statuses worth retrying (rate limiting and gateway/server errors)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def mount_retry_adapter(session: Session, pool_connections: int = 10, pool_maxsize: int = 10,
+                        total: int = 5, backoff_factor: float = 0.5) -> HTTPAdapter:
+    """
+    Mount a pooled HTTPAdapter with retry/backoff on a requests session
+
+    Only idempotent methods are retried: POSTs such as diary saves are not
+    safe to replay after the server may already have processed them.
+    Retry-After headers on 429/503 responses are honoured.
+
+    Args:
+        session: Session to configure
+        pool_connections: Number of per-host connection pools to cache
+        pool_maxsize: Maximum connections kept alive per host
+        total: Maximum number of retries per request
+        backoff_factor: Exponential backoff factor between retries
+
+    Returns:
+        The mounted adapter
+    """
+    retry = Retry(
+        total=total,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({'GET', 'HEAD', 'OPTIONS'}),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return adapter
+
+
+class ConditionalGetAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that revalidates repeat GETs with ETag/Last-Modified
+
+    Bodies of successful GET responses that carry a validator are kept in
+    memory (LRU, per URL and Authorization header). Repeat requests send
+    If-None-Match/If-Modified-Since, and a 304 is answered with the kept
+    body and headers, so unchanged pages cost one round trip and no download.
+    """
+
+    def __init__(self, *args, max_entries: int = 256, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def send(self, request, stream=False, **kwargs):
+        if request.method != 'GET' or stream:
+            return super().send(request, stream=stream, **kwargs)
+
+        key = (request.url, request.headers.get('Authorization'))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+
+        if entry:
+            etag, last_modified, headers, content = entry
+            if etag:
+                request.headers['If-None-Match'] = etag
+            if last_modified:
+                request.headers['If-Modified-Since'] = last_modified
+
+        response = super().send(request, stream=stream, **kwargs)
+
+        if response.status_code == 304 and entry:
+            # Replay the stored response, keeping any headers the 304 refreshed
+            cached_headers = CaseInsensitiveDict(headers)
+            cached_headers.update(response.headers)
+            response.status_code = 200
+            response.reason = 'OK'
+            response.headers = cached_headers
+            response._content = content
+            return response
+
+        if response.status_code == 200:
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if etag or last_modified:
+                entry = (etag, last_modified, dict(response.headers), response.content)
+                with self._lock:
+                    self._entries[key] = entry
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+
+        return response
@@ -1,8 +1,19 @@
 """Jellyfin API client for fetching watched movies"""
 import logging
+import ijson
 import requests
+from urllib3.util.request import ACCEPT_ENCODING
 from datetime import datetime, timezone
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional
+from app.http_session import mount_retry_adapter
+from app.models import MovieRecord
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    import json
+    _loads = json.loads
 
 logger = logging.getLogger(__name__)
 
@@ -10,6 +21,12 @@ logger = logging.getLogger(__name__)
 class JellyfinClient:
     """Client for interacting with Jellyfin API"""
 
+    # Number of items requested per page from /Users/{id}/Items
+    PAGE_SIZE = 500
+    # Pages up to this size (bytes on the wire) are decoded in one go;
+    # larger or unsized pages are parsed incrementally
+    STREAM_THRESHOLD = 1024 * 1024
+
     def __init__(self, url: str, api_key: str, user_id: str):
         """
         Initialize Jellyfin client
@@ -23,11 +40,14 @@ class JellyfinClient:
         self.api_key = api_key
         self.user_id = user_id
         self.session = requests.Session()
+        mount_retry_adapter(self.session)
 
-        # Set authentication header
+        # Set authentication header; advertise every encoding urllib3 can
+        # decode here (br/zstd only when brotli/zstandard are installed)
         self.session.headers.update({
             'X-Emby-Token': api_key,
-            'Accept': 'application/json'
+            'Accept': 'application/json',
+            'Accept-Encoding': ACCEPT_ENCODING
         })
 
     def test_connection(self) -> bool:
@@ -35,7 +55,7 @@ class JellyfinClient:
         try:
             response = self.session.get(f"{self.url}/System/Info")
             if response.status_code == 200:
-                info = response.json()
+                info = _loads(response.content)
                 logger.info(f"Connected to Jellyfin {info.get('Version', 'unknown')}")
                 return True
             else:
@@ -45,7 +65,7 @@ class JellyfinClient:
             logger.error(f"Jellyfin API connection test failed: {e}")
             return False
 
-    def get_watched_movies(self, since: Optional[datetime] = None) -> List[Dict]:
+    def get_watched_movies(self, since: Optional[datetime] = None) -> List[MovieRecord]:
         """
         Get list of watched movies from Jellyfin
 
@@ -53,7 +73,25 @@ class JellyfinClient:
             since: Only get movies watched after this datetime
 
         Returns:
-            List of movie dictionaries with watch history
+            List of movie records with watch history
+        """
+        movies_list = list(self.iter_watched_movies(since=since))
+        logger.info(f"Processed {len(movies_list)} movies" +
+                   (f" (since {since})" if since else ""))
+        return movies_list
+
+    def iter_watched_movies(self, since: Optional[datetime] = None) -> Iterator[MovieRecord]:
+        """
+        Stream watched movies from Jellyfin
+
+        Items are parsed incrementally from each response page, so the raw
+        JSON payload is never held in memory as a whole.
+
+        Args:
+            since: Only yield movies watched after this datetime
+
+        Yields:
+            Movie records with watch history
         """
         try:
             logger.info("Fetching watched movies from Jellyfin")
@@ -63,66 +101,90 @@ class JellyfinClient:
                 'Filters': 'IsPlayed',
                 'IncludeItemTypes': 'Movie',
                 'Recursive': 'true',
-                'Fields': 'ProviderIds,UserData,ProductionYear,PremiereDate',
+                'Fields': 'ProviderIds,UserData,ProductionYear',
                 'SortBy': 'DatePlayed',
                 'SortOrder': 'Descending',
                 'EnableUserData': 'true'
             }
 
-            # Make request
-            endpoint = f"{self.url}/Users/{self.user_id}/Items"
-            response = self.session.get(endpoint, params=params)
+            # Let the server drop items whose user data hasn't changed since the
+            # last sync. DateLastSavedForUser is bumped on every play, so this is a
+            # superset of what we need and the client-side check below still applies.
+            if since:
+                params['MinDateLastSavedForUser'] = since.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
 
-            if response.status_code != 200:
-                logger.error(f"Failed to fetch movies from Jellyfin: {response.status_code}")
-                logger.debug(f"Response: {response.text[:500]}")
-                return []
+            endpoint = f"{self.url}/Users/{self.user_id}/Items"
 
-            data = response.json()
-            items = data.get('Items', [])
+            # Bind hot-loop lookups to locals
+            extract = self._extract_movie_data
+            _datetime = datetime
+
+            # Page through results so only one page is in flight at a time
+            start_index = 0
+            while True:
+                params['StartIndex'] = start_index
+                params['Limit'] = self.PAGE_SIZE
+                page_items = 0
+
+                with self.session.get(endpoint, params=params, stream=True) as response:
+                    if response.status_code != 200:
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug(f"Response: {response.text[:500]}")
+                        # Earlier pages may already have been yielded; don't let
+                        # a partial history pass for a complete sync
+                        raise RuntimeError(f"Failed to fetch movies from Jellyfin "
+                                           f"(StartIndex {start_index}): {response.status_code}")
+
+                    content_length = int(response.headers.get('Content-Length') or 0)
+                    if 0 < content_length <= self.STREAM_THRESHOLD:
+                        items = _loads(response.content).get('Items', [])
+                    else:
+                        # Let urllib3 undo gzip/br before ijson sees the bytes
+                        response.raw.decode_content = True
+                        items = ijson.items(response.raw, 'Items.item', use_float=True)
 
-            logger.info(f"Retrieved {len(items)} watched movies from Jellyfin")
+                    # Convert to our format
+                    for item in items:
+                        page_items += 1
+                        movie_data = extract(item)
+                        if movie_data:
+                            # Filter by date if specified
+                            if since:
+                                watched_at = movie_data.watched_at
+                                if watched_at.__class__ is _datetime and watched_at < since:
+                                    continue
 
-            # Convert to our format
-            movies_list = []
-            for item in items:
-                movie_data = self._extract_movie_data(item)
-                if movie_data:
-                    # Filter by date if specified
-                    if since and movie_data.get('watched_at'):
-                        watched_at = movie_data['watched_at']
-                        if isinstance(watched_at, datetime) and watched_at < since:
-                            continue
+                            yield movie_data
 
-                    movies_list.append(movie_data)
+                start_index += page_items
+                if page_items < self.PAGE_SIZE:
+                    break
 
-            logger.info(f"Processed {len(movies_list)} movies" +
-                       (f" (since {since})" if since else ""))
-            return movies_list
+            logger.info(f"Retrieved {start_index} watched movies from Jellyfin")
 
         except Exception as e:
             logger.error(f"Error fetching watched movies from Jellyfin: {e}", exc_info=True)
             raise
 
-    def _extract_movie_data(self, item: Dict) -> Optional[Dict]:
+    def _extract_movie_data(self, item: Dict) -> Optional[MovieRecord]:
         """Extract movie data from Jellyfin item"""
         try:
+            # Get user data (watched status, date, etc.) first so unplayed
+            # items are rejected before any other field is touched
+            user_data = item.get('UserData') or {}
+            if not user_data.get('Played'):
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Skipping '{item.get('Name')}' - not marked as played")
+                return None
+
             title = item.get('Name', 'Unknown')
             year = item.get('ProductionYear')
 
             # Get provider IDs (TMDB, IMDB)
-            provider_ids = item.get('ProviderIds', {})
+            provider_ids = item.get('ProviderIds') or {}
             tmdb_id = provider_ids.get('Tmdb')
             imdb_id = provider_ids.get('Imdb')
 
-            # Get user data (watched status, date, etc.)
-            user_data = item.get('UserData', {})
-            played = user_data.get('Played', False)
-
-            if not played:
-                logger.debug(f"Skipping '{title}' - not marked as played")
-                return None
-
             # Get last played date
             last_played_date = user_data.get('LastPlayedDate')
             watched_at = None
@@ -139,17 +201,18 @@ class JellyfinClient:
                 except Exception as e:
                     logger.warning(f"Could not parse date '{last_played_date}': {e}")
 
-            logger.debug(f"Extracted movie '{title}' ({year}): tmdb={tmdb_id}, imdb={imdb_id}, watched={watched_at}")
-
-            return {
-                'title': title,
-                'year': year,
-                'tmdb_id': tmdb_id,
-                'imdb_id': imdb_id,
-                'trakt_id': None,  # Not available from Jellyfin
-                'watched_at': watched_at,
-                'rating': None  # Jellyfin ratings could be added later
-            }
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Extracted movie '{title}' ({year}): tmdb={tmdb_id}, imdb={imdb_id}, watched={watched_at}")
+
+            return MovieRecord(
+                title=title,
+                year=year,
+                trakt_id=None,  # Not available from Jellyfin
+                imdb_id=imdb_id,
+                tmdb_id=tmdb_id,
+                watched_at=watched_at,
+                rating=None  # Jellyfin ratings could be added later
+            )
 
         except Exception as e:
             logger.error(f"Error extracting movie data: {e}", exc_info=True)
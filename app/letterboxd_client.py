@@ -1,23 +1,118 @@
 """Letterboxd.com API client for uploading watch history"""
 import logging
+import os
+import sqlite3
+import threading
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
 from typing import Optional, Dict, List, Tuple
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml.etree import XPath
 import re
+from app.http_session import mount_retry_adapter
+from app.models import MovieRecord
 
 logger = logging.getLogger(__name__)
 
+# CSRF token lookups run directly on the raw response bytes
+_CSRF_INPUT_RE = re.compile(
+    rb'name=["\'](?:__csrf|csrfmiddlewaretoken|_csrf|_token|authenticity_token|'
+    rb'__RequestVerificationToken|csrf_token)["\'][^>]*value=["\']([^"\']+)'
+)
+_CSRF_META_RE = re.compile(rb'name=["\']csrf-token["\'][^>]*content=["\']([^"\']+)')
+# Cloudflare Turnstile or similar anti-bot pages
+_BOT_CHALLENGE_RE = re.compile(rb'turnstile|challenge', re.IGNORECASE)
+
+# Cookie Letterboxd sets once a session is authenticated
+_SIGNED_IN_COOKIE = 'letterboxd.signed.in.as'
+
+# Signed-in markers on the post-login page
+_LOGGED_IN_RE = re.compile(rb'href=["\'][^"\']*/sign-out/')
+
+# Compiled XPath lookups (class matching is case-insensitive like the
+# original BeautifulSoup matchers); the trailing [1] keeps only the first
+# match in document order
+_LOGIN_FORM_XPATH = XPath("(//form[contains(translate(@class, 'LOGIN', 'login'), 'login')])[1]")
+_ANY_FORM_XPATH = XPath("(//form)[1]")
+_HIDDEN_INPUT_XPATH = XPath(".//input[@type='hidden']")
+# CSRF inputs whose value attribute precedes the name (missed by _CSRF_INPUT_RE)
+_CSRF_INPUT_XPATH = XPath(
+    "(//input[@name='__csrf' or @name='csrfmiddlewaretoken' or @name='_csrf' or @name='_token'"
+    " or @name='authenticity_token' or @name='__RequestVerificationToken' or @name='csrf_token'][@value])[1]/@value"
+)
+_SIGNED_IN_MARKER_XPATH = XPath(
+    "(//a[contains(translate(@class, 'AVATAR', 'avatar'), 'avatar')]"
+    " | //nav[contains(translate(@class, 'SIGNED-IN', 'signed-in'), 'signed-in')])[1]"
+)
+_ERROR_DIV_XPATH = XPath("(//div[contains(translate(@class, 'ERROR', 'error'), 'error')])[1]")
+_FILM_ID_ATTR_XPATH = XPath("//div[@data-film-id]/@data-film-id")
+
+# data-film-id attribute as rendered on film pages
+_FILM_ID_ATTR_RE = re.compile(rb'data-film-id=["\']?(\d+)(?=["\'\s>/])')
+
+# Film slug in a film page URL, e.g. /film/inception-2010/
+_FILM_SLUG_RE = re.compile(r'/film/([^/]+)/')
+# filmId embedded in inline script JSON on film pages
+_FILM_ID_RE = re.compile(rb'"filmId"\s*:\s*"?(\d+)"?')
+
+# Error text of a diary save that rejected the tmdbId field itself, as opposed
+# to a failure specific to one film (unknown TMDB ID, server error)
+_TMDB_FIELD_REJECTED_RE = re.compile(
+    r'unknown (?:parameter|field)|unrecognized (?:parameter|field)|'
+    r'not a valid parameter|film(?:Id)? is required',
+    re.IGNORECASE
+)
+
+# Headers for AJAX diary submissions (sent per request so concurrent
+# workers never mutate the shared session headers)
+_AJAX_HEADERS = {
+    'X-Requested-With': 'XMLHttpRequest',
+    'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
+}
+
+# Letterboxd half-star rating values: 0.5 -> '1', 1.0 -> '2', ..., 5.0 -> '10'
+_RATING_MAP = {i / 2: str(i) for i in range(1, 11)}
+
+# Default location of the persistent TMDB -> Letterboxd film ID cache
+DEFAULT_FILM_ID_CACHE = os.path.expanduser('~/.cache/trakt-letterboxd/filmids.db')
+
+
+def _rating_value(rating: Optional[float]) -> str:
+    """Convert a 0.5-5.0 rating to Letterboxd's half-star value ('0' for none)"""
+    if not rating:
+        return "0"
+    return _RATING_MAP.get(rating) or str(int(rating * 2))
+
 
 class LetterboxdClient:
     """Client for interacting with Letterboxd.com"""
 
     BASE_URL = "https://letterboxd.com"
+    # Upper bound on concurrent requests against letterboxd.com
+    MAX_PARALLELISM = 8
+    # Inconclusive TMDB ID diary saves tolerated before that path is dropped
+    TMDB_PROBE_ATTEMPTS = 3
 
-    def __init__(self, username: str, password: str):
+    def __init__(self, username: str, password: str, film_id_cache_path: Optional[str] = None,
+                 parallelism: int = 4):
         self.username = username
         self.password = password
+        # Textual signed-in markers (username or 'sign out'), matched
+        # case-insensitively in one pass over the raw page bytes
+        self._signed_in_text_re = re.compile(
+            re.escape(username.encode('utf-8')) + rb'|sign out', re.IGNORECASE
+        )
+        # Number of films uploaded concurrently by upload_movies
+        self.parallelism = max(1, min(int(parallelism), self.MAX_PARALLELISM))
         self.session = requests.Session()
+        # Retry transient failures and size the connection pool so every
+        # upload worker keeps its own keep-alive connection. All traffic goes
+        # to letterboxd.com, so a single host pool is enough.
+        mount_retry_adapter(self.session, pool_connections=1, pool_maxsize=self.MAX_PARALLELISM,
+                            total=3, backoff_factor=0.5)
         # Realistic browser headers
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -35,33 +130,69 @@ class LetterboxdClient:
         })
         self.csrf_token = None
         self.logged_in = False
+        # Whether save-diary-entry accepts a TMDB ID directly (None = not
+        # settled yet); settled by one upload worker at a time
+        self._tmdb_diary_supported = None
+        self._tmdb_probe_failures = 0
+        self._tmdb_probe_lock = threading.Lock()
+        # TMDB -> Letterboxd film ID: in-process dict backed by SQLite
+        self._film_ids = {}
+        self._id_cache_lock = threading.Lock()
+        self._id_cache = self._open_id_cache(film_id_cache_path or DEFAULT_FILM_ID_CACHE)
+
+    def _open_id_cache(self, path: str) -> Optional[sqlite3.Connection]:
+        """Open (and create if needed) the persistent film ID cache"""
+        try:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(path, check_same_thread=False)
+            conn.execute('CREATE TABLE IF NOT EXISTS ids(tmdb TEXT PRIMARY KEY, film_id TEXT, ts INTEGER)')
+            logger.debug(f"Film ID cache opened at {path}")
+            return conn
+        except Exception as e:
+            logger.warning(f"Film ID cache unavailable at {path}: {e}")
+            return None
+
+    def _commit_id_cache(self):
+        """Flush pending film ID cache writes to disk"""
+        if self._id_cache is None:
+            return
+        try:
+            with self._id_cache_lock:
+                self._id_cache.commit()
+        except Exception as e:
+            logger.warning(f"Could not commit film ID cache: {e}")
 
-    def _find_csrf_token(self, soup: BeautifulSoup, response: requests.Response) -> Optional[str]:
+    def _find_csrf_token(self, html: bytes, response: requests.Response,
+                         root: Optional[lxml.html.HtmlElement] = None) -> Optional[str]:
         """
         Find CSRF token from multiple possible sources
 
         Args:
-            soup: BeautifulSoup parsed HTML
+            html: Raw (decompressed) HTML bytes
             response: Original response object
+            root: Parsed tree of the same page, if the caller already has one
 
         Returns:
             CSRF token string or None
         """
         # 1. Check hidden input fields (common names)
-        csrf_names = ['csrfmiddlewaretoken', '_csrf', '__csrf', '_token',
-                      'authenticity_token', '__RequestVerificationToken', 'csrf_token']
-
-        for name in csrf_names:
-            csrf_input = soup.find('input', {'name': name})
-            if csrf_input and csrf_input.get('value'):
-                token = csrf_input.get('value')
-                logger.debug(f"Found CSRF token in input[name='{name}']: {token[:20]}...")
+        match = _CSRF_INPUT_RE.search(html)
+        if match:
+            token = match.group(1).decode('utf-8', 'replace')
+            logger.debug(f"Found CSRF token in input field: {token[:20]}...")
+            return token
+
+        if root is not None:
+            values = _CSRF_INPUT_XPATH(root)
+            if values:
+                token = str(values[0])
+                logger.debug(f"Found CSRF token in input field: {token[:20]}...")
                 return token
 
         # 2. Check meta tag
-        csrf_meta = soup.find('meta', {'name': 'csrf-token'})
-        if csrf_meta and csrf_meta.get('content'):
-            token = csrf_meta.get('content')
+        match = _CSRF_META_RE.search(html)
+        if match:
+            token = match.group(1).decode('utf-8', 'replace')
             logger.debug(f"Found CSRF token in meta tag: {token[:20]}...")
             return token
 
@@ -79,25 +210,23 @@ class LetterboxdClient:
         logger.warning("Could not find CSRF token in any location")
         return None
 
-    def _parse_login_form(self, soup: BeautifulSoup) -> Tuple[Optional[str], Optional[Dict]]:
+    def _parse_login_form(self, root: lxml.html.HtmlElement) -> Tuple[Optional[str], Optional[Dict]]:
         """
         Parse login form to extract action URL and hidden fields
 
         Args:
-            soup: BeautifulSoup parsed HTML
+            root: Parsed lxml HTML tree
 
         Returns:
             Tuple of (form_action_url, hidden_fields_dict)
         """
-        # Find the login form
-        form = soup.find('form', {'class': lambda x: x and 'login' in x.lower() if x else False})
-        if not form:
-            # Try generic form with username/password fields
-            form = soup.find('form')
+        # Find the login form, or fall back to the first form on the page
+        forms = _LOGIN_FORM_XPATH(root) or _ANY_FORM_XPATH(root)
 
-        if not form:
+        if not forms:
             logger.error("Could not find login form on page")
             return None, None
+        form = forms[0]
 
         # Get form action
         action = form.get('action', '/user/login.do')
@@ -106,14 +235,16 @@ class LetterboxdClient:
 
         logger.debug(f"Form action: {action}")
 
-        # Extract all hidden fields
+        # Extract all hidden fields (only format per-field logs when debugging)
+        debug = logger.isEnabledFor(logging.DEBUG)
         hidden_fields = {}
-        for hidden in form.find_all('input', type='hidden'):
+        for hidden in _HIDDEN_INPUT_XPATH(form):
             name = hidden.get('name')
             value = hidden.get('value', '')
             if name:
                 hidden_fields[name] = value
-                logger.debug(f"Hidden field: {name} = {value[:50] if value else '(empty)'}...")
+                if debug:
+                    logger.debug(f"Hidden field: {name} = {value[:50] if value else '(empty)'}...")
 
         return action, hidden_fields
 
@@ -151,8 +282,9 @@ class LetterboxdClient:
             if response.encoding is None:
                 response.encoding = 'utf-8'
 
-            # Get the HTML text
+            # Get the HTML text (and raw bytes for regex lookups)
             html_text = response.text
+            html_bytes = response.content
 
             # Verify it's actual HTML
             if not html_text.strip().startswith('<'):
@@ -166,49 +298,49 @@ class LetterboxdClient:
                     if content_encoding == 'br':
                         # Brotli compression
                         import brotli
-                        html_text = brotli.decompress(response.content).decode('utf-8')
+                        html_bytes = brotli.decompress(response.content)
                         logger.info("Successfully decompressed Brotli response manually")
                     elif content_encoding == 'gzip' or content_encoding == 'x-gzip':
                         # Gzip compression
                         import gzip
-                        html_text = gzip.decompress(response.content).decode('utf-8')
+                        html_bytes = gzip.decompress(response.content)
                         logger.info("Successfully decompressed gzip response manually")
                     else:
                         # Try both as fallback
                         import brotli
                         try:
-                            html_text = brotli.decompress(response.content).decode('utf-8')
+                            html_bytes = brotli.decompress(response.content)
                             logger.info("Successfully decompressed with Brotli (fallback)")
                         except:
                             import gzip
-                            html_text = gzip.decompress(response.content).decode('utf-8')
+                            html_bytes = gzip.decompress(response.content)
                             logger.info("Successfully decompressed with gzip (fallback)")
+                    html_text = html_bytes.decode('utf-8')
                 except Exception as e:
                     logger.error(f"Could not decompress response: {e}")
                     return False
 
-            # Parse the HTML
-            soup = BeautifulSoup(html_text, 'html.parser')
-
             # Check for bot challenge / Turnstile
-            if 'turnstile' in html_text.lower() or 'challenge' in html_text.lower():
+            if _BOT_CHALLENGE_RE.search(html_bytes):
                 logger.error("Bot challenge detected (Cloudflare Turnstile or similar)")
                 logger.debug("Page contains anti-bot protection")
                 return False
 
+            # Parse the sign-in page once; the CSRF and form lookups share it
+            root = lxml.html.fromstring(html_bytes)
+
             # Step 2: Find CSRF token
-            self.csrf_token = self._find_csrf_token(soup, response)
+            self.csrf_token = self._find_csrf_token(html_bytes, response, root)
 
             if not self.csrf_token:
                 logger.error("Could not find CSRF token - dumping page info")
-                logger.debug(f"Page title: {soup.title.string if soup.title else 'No title'}")
-                logger.debug(f"Forms found: {len(soup.find_all('form'))}")
+                logger.debug(f"Forms found: {html_bytes.count(b'<form')}")
                 # Dump first 500 chars of HTML for debugging
                 logger.debug(f"HTML sample: {html_text[:500]}")
                 return False
 
             # Step 3: Parse login form
-            form_action, hidden_fields = self._parse_login_form(soup)
+            form_action, hidden_fields = self._parse_login_form(root)
 
             if not form_action:
                 logger.error("Could not parse login form")
@@ -228,19 +360,24 @@ class LetterboxdClient:
 
             logger.debug(f"Login data keys: {list(login_data.keys())}")
 
-            # Step 5: Submit login with proper headers
+            # Step 5: Submit login with proper headers. Content-Type stays off
+            # the session so later multipart posts can set their own boundary.
             self.session.headers.update({
                 'Referer': sign_in_url,
                 'Origin': self.BASE_URL,
-                'Content-Type': 'application/x-www-form-urlencoded',
             })
 
             # Add CSRF token to headers if found in meta tag
-            csrf_meta = soup.find('meta', {'name': 'csrf-token'})
+            csrf_meta = _CSRF_META_RE.search(html_bytes)
             if csrf_meta:
-                self.session.headers['X-CSRF-Token'] = csrf_meta.get('content')
+                self.session.headers['X-CSRF-Token'] = csrf_meta.group(1).decode('utf-8', 'replace')
 
-            response = self.session.post(form_action, data=login_data, allow_redirects=True)
+            response = self.session.post(
+                form_action,
+                data=login_data,
+                headers={'Content-Type': 'application/x-www-form-urlencoded'},
+                allow_redirects=True
+            )
 
             logger.info(f"Login POST completed: {response.status_code} (final URL: {response.url})")
             logger.debug(f"Response size: {len(response.content)} bytes")
@@ -267,22 +404,31 @@ class LetterboxdClient:
             # Step 7: Verify login success for HTML response
             # Check if we're redirected to homepage or profile
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
+                html_bytes = response.content
+                root = None
+
+                # Cheapest signals first: Letterboxd sets its signed-in cookie on a
+                # successful login, and a sign-out link only renders when signed in
+                signed_in = (
+                    _SIGNED_IN_COOKIE in self.session.cookies
+                    or bool(_LOGGED_IN_RE.search(html_bytes))
+                )
 
-                # Look for signed-in indicators
-                signed_in_indicators = [
-                    soup.find('a', {'class': lambda x: x and 'avatar' in x.lower() if x else False}),
-                    soup.find('nav', {'class': lambda x: x and 'signed-in' in x.lower() if x else False}),
-                    self.username.lower() in response.text.lower(),
-                    'sign out' in response.text.lower(),
-                ]
+                if not signed_in:
+                    # Fall back to structural, then textual indicators;
+                    # stop at the first one that matches
+                    root = lxml.html.fromstring(html_bytes)
+                    signed_in = bool(
+                        _SIGNED_IN_MARKER_XPATH(root)
+                        or self._signed_in_text_re.search(html_bytes)
+                    )
 
-                if any(signed_in_indicators):
+                if signed_in:
                     logger.info("✓ Successfully logged in to Letterboxd")
                     self.logged_in = True
 
                     # Update CSRF token from new page
-                    new_csrf = self._find_csrf_token(soup, response)
+                    new_csrf = self._find_csrf_token(html_bytes, response)
                     if new_csrf:
                         self.csrf_token = new_csrf
 
@@ -292,9 +438,9 @@ class LetterboxdClient:
                     logger.debug(f"Checking for error messages...")
 
                     # Look for error messages
-                    error_div = soup.find('div', {'class': lambda x: x and 'error' in x.lower() if x else False})
-                    if error_div:
-                        logger.error(f"Error message: {error_div.get_text(strip=True)}")
+                    error_divs = _ERROR_DIV_XPATH(root)
+                    if error_divs:
+                        logger.error(f"Error message: {error_divs[0].text_content().strip()}")
 
                     return False
             else:
@@ -307,7 +453,47 @@ class LetterboxdClient:
 
     def get_film_id_from_tmdb(self, tmdb_id: str) -> Optional[str]:
         """
-        Get Letterboxd film ID from TMDB ID
+        Get Letterboxd film ID from TMDB ID, using the local caches first
+
+        Args:
+            tmdb_id: TMDB ID of the film
+
+        Returns:
+            Letterboxd film ID or None if not found
+        """
+        key = str(tmdb_id)
+        film_id = self._film_ids.get(key)
+        if film_id:
+            return film_id
+
+        if self._id_cache is not None:
+            try:
+                with self._id_cache_lock:
+                    row = self._id_cache.execute('SELECT film_id FROM ids WHERE tmdb=?', (key,)).fetchone()
+                if row:
+                    logger.debug("Film ID cache hit for TMDB %s: %s", tmdb_id, row[0])
+                    self._film_ids[key] = row[0]
+                    return row[0]
+            except Exception as e:
+                logger.warning(f"Film ID cache lookup failed: {e}")
+
+        film_id = self._fetch_film_id_from_tmdb(tmdb_id)
+        if film_id:
+            self._film_ids[key] = film_id
+            if self._id_cache is not None:
+                try:
+                    with self._id_cache_lock:
+                        self._id_cache.execute(
+                            'INSERT OR REPLACE INTO ids(tmdb, film_id, ts) VALUES (?, ?, ?)',
+                            (key, film_id, int(time.time()))
+                        )
+                except Exception as e:
+                    logger.warning(f"Film ID cache write failed: {e}")
+        return film_id
+
+    def _fetch_film_id_from_tmdb(self, tmdb_id: str) -> Optional[str]:
+        """
+        Resolve Letterboxd film ID from TMDB ID over the network
 
         Args:
             tmdb_id: TMDB ID of the film
@@ -316,46 +502,52 @@ class LetterboxdClient:
             Letterboxd film ID or None if not found
         """
         try:
-            # Letterboxd has a /tmdb/ redirect endpoint
+            # Letterboxd has a /tmdb/ redirect endpoint. Stream the response so
+            # the status and final URL can be checked before the body is read
             tmdb_url = f"{self.BASE_URL}/tmdb/{tmdb_id}"
-            response = self.session.get(tmdb_url, allow_redirects=True)
+            with self.session.get(tmdb_url, allow_redirects=True, stream=True) as response:
+                if response.status_code != 200:
+                    logger.warning(f"TMDB redirect failed for {tmdb_id}: {response.status_code}")
+                    return None
 
-            if response.status_code == 200:
                 # Extract film slug from final URL
                 # Example: https://letterboxd.com/film/inception-2010/ -> inception-2010
-                final_url = response.url
-                match = re.search(r'/film/([^/]+)/', final_url)
-
-                if match:
-                    film_slug = match.group(1)
-
-                    # Now we need to get the actual film ID from the page
-                    soup = BeautifulSoup(response.text, 'html.parser')
-
-                    # Look for data-film-id attribute
-                    film_container = soup.find('div', {'data-film-id': True})
-                    if film_container:
-                        film_id = film_container.get('data-film-id')
-                        logger.debug(f"Found Letterboxd film ID {film_id} for TMDB {tmdb_id}")
-                        return film_id
-
-                    # Alternative: look in script tags for filmId
-                    for script in soup.find_all('script'):
-                        if script.string and 'filmId' in script.string:
-                            match = re.search(r'"filmId"\s*:\s*"?(\d+)"?', script.string)
-                            if match:
-                                film_id = match.group(1)
-                                logger.debug(f"Found Letterboxd film ID {film_id} for TMDB {tmdb_id}")
-                                return film_id
-
-                    logger.warning(f"Could not extract film ID for TMDB {tmdb_id}")
-                    return None
-                else:
+                match = _FILM_SLUG_RE.search(response.url)
+                if not match:
+                    # Not a film page - close without downloading the body
                     logger.warning(f"Could not parse film URL for TMDB {tmdb_id}")
                     return None
-            else:
-                logger.warning(f"TMDB redirect failed for {tmdb_id}: {response.status_code}")
-                return None
+
+                # The diary endpoint needs the numeric film ID, which is only
+                # available from the page itself. Read the whole body so the
+                # connection goes back to the pool for the next lookup.
+                html_bytes = response.content
+
+            # Look for the data-film-id attribute with a single scan over the
+            # raw bytes before falling back to anything heavier
+            match = _FILM_ID_ATTR_RE.search(html_bytes)
+            if match:
+                film_id = match.group(1).decode('ascii')
+                logger.debug("Found Letterboxd film ID %s for TMDB %s", film_id, tmdb_id)
+                return film_id
+
+            # Alternative: filmId embedded in inline script JSON - a single
+            # scan over the raw bytes, so try it before building a DOM
+            match = _FILM_ID_RE.search(html_bytes)
+            if match:
+                film_id = match.group(1).decode('ascii')
+                logger.debug("Found Letterboxd film ID %s for TMDB %s", film_id, tmdb_id)
+                return film_id
+
+            # Last resort: data-film-id attribute in unusual markup
+            film_ids = _FILM_ID_ATTR_XPATH(lxml.html.fromstring(html_bytes))
+            if film_ids:
+                film_id = str(film_ids[0])
+                logger.debug("Found Letterboxd film ID %s for TMDB %s", film_id, tmdb_id)
+                return film_id
+
+            logger.warning(f"Could not extract film ID for TMDB {tmdb_id}")
+            return None
 
         except Exception as e:
             logger.error(f"Error getting film ID for TMDB {tmdb_id}: {e}")
@@ -367,7 +559,8 @@ class LetterboxdClient:
         watched_date: datetime,
         rating: Optional[float] = None,
         liked: bool = False,
-        tags: Optional[List[str]] = None
+        tags: Optional[List[str]] = None,
+        template: Optional[Dict] = None
     ) -> bool:
         """
         Mark a film as watched on Letterboxd
@@ -378,6 +571,8 @@ class LetterboxdClient:
             rating: Rating (0.5 to 5.0 in 0.5 increments), None for no rating
             liked: Whether the film is liked
             tags: Optional list of tags
+            template: Prebuilt payload from _build_diary_template (tags are
+                then taken from the template)
 
         Returns:
             True if successful, False otherwise
@@ -392,45 +587,28 @@ class LetterboxdClient:
             # Format the viewing date
             viewing_date_str = watched_date.strftime('%Y-%m-%d')
 
-            # Prepare rating (convert to Letterboxd format: 0, 1-10 as half-stars)
-            # Rating 0.5 -> 1, 1.0 -> 2, 1.5 -> 3, ..., 5.0 -> 10
-            rating_value = "0"
-            if rating:
-                rating_value = str(int(rating * 2))
-
-            # Prepare data - based on actual Letterboxd AJAX request
-            # Film ID needs 'film:' prefix and is called viewingableUid/viewingableUID
-            diary_data = {
-                'json': 'true',
-                '__csrf': self.csrf_token,
-                'viewingId': '',  # Empty for new entries
-                'viewingableUid': f'film:{film_id}',
-                'specifiedDate': 'true',
-                'viewingDateStr': viewing_date_str,
-                'review': '',
-                'tags': ','.join(tags) if tags else '',
-                'rating': rating_value,
-                'viewingableUID': f'film:{film_id}',  # Note: different casing
-            }
-
-            # Add AJAX header for proper diary entry
-            self.session.headers.update({
-                'X-Requested-With': 'XMLHttpRequest',
-                'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8',
-            })
+            # Only the per-film fields change between entries
+            diary_data = (template or self._build_diary_template(tags)).copy()
+            film_uid = f'film:{film_id}'
+            diary_data['viewingableUid'] = film_uid
+            diary_data['viewingableUID'] = film_uid  # Note: different casing
+            diary_data['viewingDateStr'] = viewing_date_str
+            diary_data['rating'] = _rating_value(rating)
 
-            # Submit to Letterboxd
+            # Submit to Letterboxd (with AJAX headers for proper diary entry)
             save_url = f"{self.BASE_URL}/s/save-diary-entry"
-            response = self.session.post(save_url, data=diary_data)
+            response = self.session.post(save_url, data=diary_data, headers=_AJAX_HEADERS)
 
-            logger.debug(f"Diary entry response: {response.status_code}")
-            logger.debug(f"Response headers: {response.headers}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Diary entry response: {response.status_code}")
+                logger.debug(f"Response headers: {response.headers}")
 
             # Check if response is JSON
             if 'json' in response.headers.get('Content-Type', '').lower():
                 try:
                     json_response = response.json()
-                    logger.debug(f"JSON Response: {json_response}")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(f"JSON Response: {json_response}")
                     # Check for success in JSON
                     if json_response.get('result') == 'success' or response.status_code == 200:
                         logger.info(f"✓ Successfully added film {film_id} to diary")
@@ -443,13 +621,97 @@ class LetterboxdClient:
                 return True
             else:
                 logger.error(f"Failed to mark film as watched: {response.status_code}")
-                logger.debug(f"Response: {response.text[:500]}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Response: {response.text[:500]}")
                 return False
 
         except Exception as e:
             logger.error(f"Error marking film as watched: {e}")
             return False
 
+    def _mark_as_watched_by_tmdb(
+        self,
+        tmdb_id: str,
+        watched_date: datetime,
+        rating: Optional[float] = None,
+        template: Optional[Dict] = None
+    ) -> Optional[bool]:
+        """
+        Save a diary entry keyed by TMDB ID, skipping the film ID lookup
+
+        Only an explicit JSON success counts, so a server that ignores the
+        field is never mistaken for a saved entry.
+
+        Returns:
+            True if Letterboxd confirmed the entry, None if it rejected the
+            tmdbId field itself, False for any other failure
+        """
+        try:
+            diary_data = (template or self._build_diary_template()).copy()
+            diary_data['tmdbId'] = str(tmdb_id)
+            diary_data['viewingDateStr'] = watched_date.strftime('%Y-%m-%d')
+            diary_data['rating'] = _rating_value(rating)
+
+            save_url = f"{self.BASE_URL}/s/save-diary-entry"
+            response = self.session.post(save_url, data=diary_data, headers=_AJAX_HEADERS)
+
+            if 'json' in response.headers.get('Content-Type', '').lower():
+                json_response = response.json()
+                if response.status_code == 200 and json_response.get('result') == 'success':
+                    logger.info(f"✓ Successfully added TMDB {tmdb_id} to diary")
+                    return True
+                messages = str(json_response.get('messages') or json_response.get('message') or '')
+                if _TMDB_FIELD_REJECTED_RE.search(messages):
+                    return None
+            return False
+
+        except Exception as e:
+            logger.debug("Diary entry by TMDB ID failed for %s: %s", tmdb_id, e)
+            return False
+
+    def _save_by_tmdb(
+        self,
+        tmdb_id: str,
+        watched_date: datetime,
+        rating: Optional[float],
+        template: Optional[Dict]
+    ) -> Optional[bool]:
+        """
+        Try the TMDB ID diary path, settling whether Letterboxd supports it
+
+        The path is only dropped when Letterboxd rejects the tmdbId field, or
+        after TMDB_PROBE_ATTEMPTS inconclusive tries without any success; a
+        failure specific to one film leaves it open for the next. Until it
+        is settled, attempts run one at a time so workers don't all probe.
+
+        Returns:
+            True if the entry was saved, None if the path is unsupported (so
+            nothing was saved), False if the attempt failed and may or may
+            not have been saved
+        """
+        if self._tmdb_diary_supported:
+            return self._mark_as_watched_by_tmdb(tmdb_id, watched_date, rating, template)
+
+        with self._tmdb_probe_lock:
+            if self._tmdb_diary_supported is False:
+                return None
+
+            saved = self._mark_as_watched_by_tmdb(tmdb_id, watched_date, rating, template)
+            if saved:
+                self._tmdb_diary_supported = True
+                return True
+
+            if saved is None:
+                logger.info("Diary entries by TMDB ID not supported - resolving film IDs")
+                self._tmdb_diary_supported = False
+                return None
+            if self._tmdb_diary_supported is None:
+                self._tmdb_probe_failures += 1
+                if self._tmdb_probe_failures >= self.TMDB_PROBE_ATTEMPTS:
+                    logger.info("Diary entries by TMDB ID keep failing - resolving film IDs")
+                    self._tmdb_diary_supported = False
+            return False
+
     def is_film_in_diary(self, film_id: str, watched_date: datetime) -> bool:
         """
         Check if a film is already in the diary for a specific date
@@ -471,12 +733,86 @@ class LetterboxdClient:
             logger.error(f"Error checking diary: {e}")
             return False
 
-    def upload_movies(self, movies: List[Dict]) -> Dict:
+    def _build_diary_template(self, tags: Optional[List[str]] = None) -> Dict:
+        """
+        Build the diary payload fields that are identical for every film
+
+        Based on the actual Letterboxd AJAX request; the film ID goes into
+        viewingableUid/viewingableUID with a 'film:' prefix per entry.
+        """
+        return {
+            'json': 'true',
+            '__csrf': self.csrf_token,
+            'viewingId': '',  # Empty for new entries
+            'specifiedDate': 'true',
+            'review': '',
+            'tags': ','.join(tags) if tags else '',
+        }
+
+    def _upload_movie(self, movie: MovieRecord, template: Optional[Dict] = None) -> Tuple[str, Optional[str]]:
+        """
+        Upload a single movie to Letterboxd
+
+        Returns:
+            Tuple of (result key, error message or None) where the key is
+            one of 'success', 'failed' or 'skipped'
+        """
+        title = movie.title or 'Unknown'
+        try:
+            tmdb_id = movie.tmdb_id
+            if not tmdb_id:
+                logger.warning(f"Skipping movie without TMDB ID: {title}")
+                return 'skipped', None
+
+            # Mark as watched
+            watched_date = movie.watched_at
+            if isinstance(watched_date, str):
+                watched_date = datetime.fromisoformat(watched_date.replace('Z', '+00:00'))
+
+            rating = movie.rating
+
+            # Save by TMDB ID in one round trip when Letterboxd accepts it.
+            # Diary POSTs are not idempotent, so only fall back to resolving
+            # the film ID when the tmdbId field was rejected outright; any
+            # other failure may already have logged the entry.
+            if self._tmdb_diary_supported is not False:
+                saved = self._save_by_tmdb(tmdb_id, watched_date, rating, template)
+                if saved:
+                    logger.info(f"✓ Uploaded: {title}")
+                    return 'success', None
+                if saved is False:
+                    return 'failed', f"Failed to upload {title}"
+
+            # Get Letterboxd film ID
+            film_id = self.get_film_id_from_tmdb(tmdb_id)
+            if not film_id:
+                logger.warning(f"Could not find Letterboxd ID for {title} (TMDB: {tmdb_id})")
+                return 'failed', f"No Letterboxd match for {title}"
+
+            success = self.mark_as_watched(
+                film_id=film_id,
+                watched_date=watched_date,
+                rating=rating,
+                liked=False,  # Could be configurable
+                tags=None,  # Could add "trakt-sync" tag
+                template=template
+            )
+
+            if success:
+                logger.info(f"✓ Uploaded: {title}")
+                return 'success', None
+            return 'failed', f"Failed to upload {title}"
+
+        except Exception as e:
+            logger.error(f"Error processing movie {title}: {e}")
+            return 'failed', str(e)
+
+    def upload_movies(self, movies: List[MovieRecord]) -> Dict:
         """
         Upload multiple movies to Letterboxd
 
         Args:
-            movies: List of movie dictionaries with:
+            movies: List of movie records; uses:
                 - tmdb_id: TMDB ID
                 - watched_at: datetime object
                 - rating: Optional rating (Letterboxd scale 0.5-5.0)
@@ -497,50 +833,19 @@ class LetterboxdClient:
                 result['errors'].append("Failed to login to Letterboxd")
                 return result
 
-        logger.info(f"Uploading {len(movies)} movies to Letterboxd")
+        logger.info(f"Uploading {len(movies)} movies to Letterboxd ({self.parallelism} workers)")
 
-        for movie in movies:
-            try:
-                tmdb_id = movie.get('tmdb_id')
-                if not tmdb_id:
-                    logger.warning(f"Skipping movie without TMDB ID: {movie.get('title', 'Unknown')}")
-                    result['skipped'] += 1
-                    continue
-
-                # Get Letterboxd film ID
-                film_id = self.get_film_id_from_tmdb(tmdb_id)
-                if not film_id:
-                    logger.warning(f"Could not find Letterboxd ID for {movie.get('title', 'Unknown')} (TMDB: {tmdb_id})")
-                    result['failed'] += 1
-                    result['errors'].append(f"No Letterboxd match for {movie.get('title', 'Unknown')}")
-                    continue
-
-                # Mark as watched
-                watched_date = movie.get('watched_at')
-                if isinstance(watched_date, str):
-                    watched_date = datetime.fromisoformat(watched_date.replace('Z', '+00:00'))
-
-                rating = movie.get('rating')
-
-                success = self.mark_as_watched(
-                    film_id=film_id,
-                    watched_date=watched_date,
-                    rating=rating,
-                    liked=False,  # Could be configurable
-                    tags=None  # Could add "trakt-sync" tag
-                )
+        # Lookups and diary POSTs are network-bound, so overlap them across
+        # a small pool; results are aggregated here on the calling thread
+        template = self._build_diary_template()
+        with ThreadPoolExecutor(max_workers=self.parallelism) as executor:
+            for status, error in executor.map(lambda movie: self._upload_movie(movie, template), movies):
+                result[status] += 1
+                if error:
+                    result['errors'].append(error)
 
-                if success:
-                    result['success'] += 1
-                    logger.info(f"✓ Uploaded: {movie.get('title', 'Unknown')}")
-                else:
-                    result['failed'] += 1
-                    result['errors'].append(f"Failed to upload {movie.get('title', 'Unknown')}")
-
-            except Exception as e:
-                logger.error(f"Error processing movie {movie.get('title', 'Unknown')}: {e}")
-                result['failed'] += 1
-                result['errors'].append(str(e))
+        # Persist newly resolved film IDs in a single transaction
+        self._commit_id_cache()
 
         logger.info(f"Upload complete: {result['success']} successful, {result['failed']} failed, {result['skipped']} skipped")
         return result
@@ -1,30 +1,47 @@
 """Letterboxd CSV generation and upload"""
 import csv
+import heapq
 import logging
 import os
 from datetime import datetime
-from typing import List, Dict
+from functools import lru_cache
+from typing import Iterable, List, Dict, Optional, Tuple
 from pathlib import Path
+from app.models import MovieRecord
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=1024)
+def _format_date_str(value: str) -> str:
+    """Format an ISO 8601 string as YYYY-MM-DD (cached; many films share a day)"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).strftime('%Y-%m-%d')
+
+
 class LetterboxdCSV:
     """Generate and manage Letterboxd import CSV files"""
 
     # Letterboxd CSV columns
     COLUMNS = ['Title', 'Year', 'imdbID', 'tmdbID', 'WatchedDate', 'Rating']
 
+    # Trakt ratings are whole numbers 1-10, so precompute every conversion
+    _RATING_TABLE = {
+        i: f"{max(0.5, min(5.0, round((i / 10.0) * 5.0 * 2) / 2)):.1f}" for i in range(1, 11)
+    }
+
     def __init__(self, export_path='/app/data/exports'):
         self.export_path = export_path
         Path(export_path).mkdir(parents=True, exist_ok=True)
 
-    def generate_csv(self, movies: List[Dict], filename: str = None) -> str:
+    def generate_csv(self, movies: Iterable[MovieRecord], filename: str = None) -> str:
         """
         Generate Letterboxd CSV from movie data
 
+        Rows are written as they are produced, so movies may be any iterable
+        (e.g. a generator) and is never materialized.
+
         Args:
-            movies: List of movie dictionaries from Trakt
+            movies: Iterable of movie records from Trakt or Jellyfin
             filename: Optional custom filename (default: letterboxd_import_YYYYMMDD_HHMMSS.csv)
 
         Returns:
@@ -35,42 +52,60 @@ class LetterboxdCSV:
             filename = f'letterboxd_import_{timestamp}.csv'
 
         filepath = os.path.join(self.export_path, filename)
+        # Written under a temp name and swapped in once complete, so a source
+        # that fails mid-stream never leaves a truncated export behind
+        tmp_path = filepath + '.tmp'
 
         try:
-            with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=self.COLUMNS)
-                writer.writeheader()
+            written = 0
 
+            def rows():
+                # Plain tuples in COLUMNS order; skipped movies are dropped
+                nonlocal written
                 for movie in movies:
-                    row = self._format_movie_row(movie)
+                    row = self._row_tuple(movie) if movie else None
                     if row:
-                        writer.writerow(row)
+                        written += 1
+                        yield row
+
+            # A 1 MiB buffer keeps write syscalls rare on large exports
+            with open(tmp_path, 'w', newline='', encoding='utf-8', buffering=1 << 20) as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(self.COLUMNS)
+                writer.writerows(rows())
+            os.replace(tmp_path, filepath)
 
-            logger.info(f"Generated CSV with {len(movies)} movies at {filepath}")
+            logger.info(f"Generated CSV with {written} movies at {filepath}")
             return filepath
 
         except Exception as e:
             logger.error(f"Error generating CSV: {e}")
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
             raise
 
-    def _format_movie_row(self, movie: Dict) -> Dict:
-        """Format a movie dictionary into Letterboxd CSV row"""
+    def _row_tuple(self, movie: MovieRecord) -> Optional[Tuple]:
+        """Format a movie record into a Letterboxd CSV row (in COLUMNS order)"""
         try:
-            row = {
-                'Title': movie.get('title', ''),
-                'Year': movie.get('year', ''),
-                'imdbID': movie.get('imdb_id', ''),
-                'tmdbID': movie.get('tmdb_id', ''),
-                'WatchedDate': self._format_date(movie.get('watched_at')),
-                'Rating': self._convert_rating(movie.get('rating'))
-            }
+            title = movie.title
+            imdb_id = movie.imdb_id
+            tmdb_id = movie.tmdb_id
 
             # Letterboxd requires at least one identifier
-            if not any([row['imdbID'], row['tmdbID'], row['Title']]):
+            if not (imdb_id or tmdb_id or title):
                 logger.warning(f"Skipping movie without identifier: {movie}")
                 return None
 
-            return row
+            return (
+                title,
+                movie.year,
+                imdb_id,
+                tmdb_id,
+                self._format_date(movie.watched_at),
+                self._convert_rating(movie.rating)
+            )
 
         except Exception as e:
             logger.error(f"Error formatting movie row: {e}")
@@ -86,8 +121,7 @@ class LetterboxdCSV:
                 return date_value.strftime('%Y-%m-%d')
             elif isinstance(date_value, str):
                 # Try to parse ISO format
-                dt = datetime.fromisoformat(date_value.replace('Z', '+00:00'))
-                return dt.strftime('%Y-%m-%d')
+                return _format_date_str(date_value)
             else:
                 return str(date_value)
         except Exception as e:
@@ -107,6 +141,10 @@ class LetterboxdCSV:
         if not rating:
             return ''
 
+        converted = self._RATING_TABLE.get(rating)
+        if converted is not None:
+            return converted
+
         try:
             # Trakt uses 1-10, Letterboxd uses 0.5-5.0
             trakt_rating = float(rating)
@@ -135,24 +173,30 @@ class LetterboxdCSV:
             limit: Maximum number of exports to return
 
         Returns:
-            List of export info dictionaries
+            List of export info dictionaries (timestamps as epoch seconds)
         """
         try:
+            with os.scandir(self.export_path) as it:
+                entries = [
+                    e for e in it
+                    if e.name.startswith('letterboxd_import_') and e.name.endswith('.csv')
+                ]
+
+            # Most recently modified first; DirEntry caches its stat result
+            newest = heapq.nlargest(limit, entries, key=lambda e: e.stat().st_mtime)
+
             exports = []
-            for file in Path(self.export_path).glob('letterboxd_import_*.csv'):
-                stat = file.stat()
+            for entry in newest:
+                stat = entry.stat()
                 exports.append({
-                    'filename': file.name,
-                    'path': str(file),
+                    'filename': entry.name,
+                    'path': entry.path,
                     'size': stat.st_size,
-                    'created': datetime.fromtimestamp(stat.st_ctime),
-                    'modified': datetime.fromtimestamp(stat.st_mtime)
+                    'created_epoch': stat.st_ctime,
+                    'modified_epoch': stat.st_mtime
                 })
 
-            # Sort by modified time, most recent first
-            exports.sort(key=lambda x: x['modified'], reverse=True)
-
-            return exports[:limit]
+            return exports
 
         except Exception as e:
             logger.error(f"Error getting recent exports: {e}")
@@ -173,20 +217,24 @@ class LetterboxdCSV:
         }
 
         try:
-            with open(filepath, 'r', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
+            with open(filepath, 'r', encoding='utf-8', newline='') as csvfile:
+                reader = csv.reader(csvfile)
+                header = next(reader, [])
 
                 # Check for required columns
-                if not any(col in reader.fieldnames for col in ['Title', 'imdbID', 'tmdbID']):
+                id_columns = [i for i, col in enumerate(header) if col in ('Title', 'imdbID', 'tmdbID')]
+                if not id_columns:
                     result['errors'].append("Missing required identifier columns")
                     return result
 
-                # Count rows and check for issues
-                for i, row in enumerate(reader, start=2):
+                # Count rows and check for issues; blank lines are skipped like
+                # DictReader did, and rows may be shorter than the header
+                for i, row in enumerate(filter(None, reader), start=2):
                     result['row_count'] += 1
 
                     # Check if row has at least one identifier
-                    if not any([row.get('Title'), row.get('imdbID'), row.get('tmdbID')]):
+                    width = len(row)
+                    if not any(row[col] for col in id_columns if col < width):
                         result['warnings'].append(f"Row {i}: No identifier found")
 
                 result['valid'] = len(result['errors']) == 0
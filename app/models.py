@@ -0,0 +1,18 @@
+"""Shared data records"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass(slots=True)
+class MovieRecord:
+    """A watched movie as produced by the Trakt and Jellyfin clients"""
+
+    title: Optional[str]
+    year: Optional[int]
+    trakt_id: Optional[str]
+    imdb_id: Optional[str]
+    tmdb_id: Optional[str]
+    watched_at: Optional[datetime]
+    # Trakt 1-10 rating, merged in separately
+    rating: Optional[float] = None
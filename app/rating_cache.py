@@ -0,0 +1,56 @@
+"""On-disk cache of Trakt movie ratings"""
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class RatingCache:
+    """
+    Persists the Trakt ratings dict together with the account's
+    movies.rated_at activity timestamp, so ratings are only re-downloaded
+    after they actually change
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Tuple[Optional[Dict[str, float]], Optional[str]]:
+        """
+        Load cached ratings
+
+        Returns:
+            Tuple of (ratings dict, rated_at timestamp), or (None, None) if
+            there is no usable cache
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data['ratings'], data['rated_at']
+        except FileNotFoundError:
+            return None, None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable rating cache {self.path}: {e}")
+            return None, None
+
+    def save(self, ratings: Dict[str, float], rated_at: str) -> bool:
+        """
+        Atomically write ratings and the rated_at timestamp they belong to
+
+        Returns:
+            True if the cache was written, False otherwise
+        """
+        try:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'rated_at': rated_at, 'ratings': ratings}, f)
+            os.replace(tmp_path, self.path)
+            logger.debug(f"Saved {len(ratings)} ratings to {self.path}")
+            return True
+        except Exception as e:
+            logger.warning(f"Could not write rating cache {self.path}: {e}")
+            return False
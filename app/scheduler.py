@@ -16,6 +16,16 @@ class SyncScheduler:
         self.scheduler = BackgroundScheduler()
         self.job_id = 'trakt_letterboxd_sync'
         self.is_running = False
+        # Last parsed cron expression and its trigger
+        self._trigger_cache = (None, None)
+
+    def _get_trigger(self, cron_expression):
+        """Return a CronTrigger for the expression, reusing the last parsed one"""
+        cached_expression, trigger = self._trigger_cache
+        if cron_expression != cached_expression:
+            trigger = CronTrigger.from_crontab(cron_expression)
+            self._trigger_cache = (cron_expression, trigger)
+        return trigger
 
     def start(self):
         """Start the scheduler"""
@@ -30,7 +40,7 @@ class SyncScheduler:
             # Add sync job
             self.scheduler.add_job(
                 func=self._scheduled_sync,
-                trigger=CronTrigger.from_crontab(schedule),
+                trigger=self._get_trigger(schedule),
                 id=self.job_id,
                 name='Trakt to Letterboxd Sync',
                 replace_existing=True
@@ -105,13 +115,15 @@ class SyncScheduler:
             cron_expression: New cron expression for schedule
         """
         try:
+            # Parse first so an invalid expression never reaches the config
+            trigger = self._get_trigger(cron_expression)
+
             # Update config
             self.config.set('sync', 'schedule', value=cron_expression)
 
-            # Restart scheduler if it's running
+            # Swap the trigger in place if running, otherwise start fresh
             if self.is_running:
-                self.stop()
-                self.start()
+                self.scheduler.reschedule_job(self.job_id, trigger=trigger)
             else:
                 self.start()
 
@@ -1,6 +1,10 @@
 """Main sync orchestration"""
 import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from itertools import chain
 from typing import Optional, Dict, List
 from app.trakt_client import TraktClient
 from app.jellyfin_client import JellyfinClient
@@ -19,6 +23,8 @@ class SyncManager:
         self.trakt_client = None
         self.jellyfin_client = None
         self.letterboxd_client = None
+        # Held for the duration of a sync so manual and scheduled runs never overlap
+        self._sync_lock = threading.Lock()
         self.letterboxd_csv = LetterboxdCSV(
             export_path=config_manager.get('sync', 'export_path')
         )
@@ -39,17 +45,24 @@ class SyncManager:
                 return
 
             # Debug logging
-            logger.info(f"Initializing Trakt client with credentials:")
-            logger.info(f"  - client_id: {'SET' if client_id else 'MISSING'}")
-            logger.info(f"  - client_secret: {'SET' if client_secret else 'MISSING'}")
-            logger.info(f"  - access_token: {'SET' if access_token else 'MISSING'}")
-            logger.info(f"  - refresh_token: {'SET' if refresh_token else 'MISSING'}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Initializing Trakt client with credentials: "
+                             f"client_id={'SET' if client_id else 'MISSING'}, "
+                             f"client_secret={'SET' if client_secret else 'MISSING'}, "
+                             f"access_token={'SET' if access_token else 'MISSING'}, "
+                             f"refresh_token={'SET' if refresh_token else 'MISSING'}")
+
+            # Ratings cache lives on the data volume next to the sync state
+            ratings_cache = self.config.get('trakt', 'ratings_cache') or os.path.join(
+                os.path.dirname(self.config.get('sync', 'last_sync_file')), 'ratings.json'
+            )
 
             self.trakt_client = TraktClient(
                 client_id=client_id,
                 client_secret=client_secret,
                 access_token=access_token,
-                refresh_token=refresh_token
+                refresh_token=refresh_token,
+                ratings_cache_path=ratings_cache
             )
 
             logger.info("Trakt client initialized successfully")
@@ -105,9 +118,17 @@ class SyncManager:
                 logger.info("Letterboxd credentials not configured - auto-upload disabled")
                 return
 
+            # Keep the film ID cache next to the other sync state so it lives
+            # on the persistent data volume
+            film_id_cache = self.config.get('letterboxd', 'film_id_cache') or os.path.join(
+                os.path.dirname(self.config.get('sync', 'last_sync_file')), 'film_ids.db'
+            )
+
             self.letterboxd_client = LetterboxdClient(
                 username=username,
-                password=password
+                password=password,
+                film_id_cache_path=film_id_cache,
+                parallelism=self.config.get('letterboxd', 'upload_workers', default=4)
             )
 
             logger.info("Letterboxd client initialized")
@@ -119,12 +140,33 @@ class SyncManager:
         """
         Perform sync from Jellyfin/Trakt to Letterboxd
 
+        Returns straight away (with in_progress set) if another sync is
+        still running.
+
         Args:
             full_sync: If True, sync all history. If False, only sync since last sync.
 
         Returns:
             Dictionary with sync results
         """
+        if not self._sync_lock.acquire(blocking=False):
+            logger.warning("Sync already in progress - not starting another")
+            return {
+                'success': False,
+                'movies_synced': 0,
+                'csv_path': None,
+                'error': 'Sync already in progress',
+                'in_progress': True,
+                'timestamp': datetime.now().isoformat()
+            }
+
+        try:
+            return self._run_sync(full_sync)
+        finally:
+            self._sync_lock.release()
+
+    def _run_sync(self, full_sync: bool) -> Dict:
+        """Run one sync (the caller holds the sync lock)"""
         result = {
             'success': False,
             'movies_synced': 0,
@@ -154,36 +196,77 @@ class SyncManager:
 
             logger.info(f"Starting sync from {source_name} (full_sync={full_sync}, since={since})")
 
-            # Fetch watched movies from source
-            watched_movies = source_client.get_watched_movies(since=since)
-
-            if not watched_movies:
-                logger.info("No movies to sync")
-                result['success'] = True
-                result['movies_synced'] = 0
-                return result
-
-            # Fetch ratings (only for Trakt source)
-            if source_name == "Trakt" and self.trakt_client:
-                ratings = self.trakt_client.get_movie_ratings()
+            # Trakt reports when movies were last watched/rated; if neither moved
+            # since the last sync there is nothing to fetch
+            activities = None
+            if source_name == "Trakt":
+                activities = self.trakt_client.get_last_activities()
+                if since and self._no_movie_activity_since(activities, since):
+                    logger.info(f"No Trakt movie activity since {since} - nothing to sync")
+                    result['success'] = True
+                    result['movies_synced'] = 0
+                    return result
 
-                # Merge ratings with watched movies
-                for movie in watched_movies:
-                    trakt_id = str(movie.get('trakt_id', ''))
-                    if trakt_id in ratings:
-                        movie['rating'] = ratings[trakt_id]
-
-            # Generate Letterboxd CSV
-            csv_path = self.letterboxd_csv.generate_csv(watched_movies)
+            auto_upload = self.config.get('letterboxd', 'auto_upload', default=False)
+            # The uploader needs the full list; otherwise movies stream
+            # straight from the source into the CSV
+            upload_movies = [] if auto_upload and self.letterboxd_client else None
+            movie_count = 0
+
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                # Fetch ratings (only for Trakt source) while the first history
+                # page downloads; the stream waits for them at its first movie
+                ratings_future = None
+                if source_name == "Trakt":
+                    ratings_future = executor.submit(self.trakt_client.get_movie_ratings, activities)
+
+                def stream_movies():
+                    nonlocal movie_count
+                    movies = iter(source_client.iter_watched_movies(since=since))
+                    first = next(movies, None)
+                    if first is None:
+                        return
+                    movies = chain((first,), movies)
+
+                    # Merge ratings with watched movies. Users without ratings
+                    # (and non-Trakt sources) skip the merge pass entirely.
+                    ratings = ratings_future.result() if ratings_future is not None else None
+                    if ratings:
+                        get_rating = ratings.get
+
+                        def merge_rating(movie):
+                            # trakt.py already hands out IDs as str, the same
+                            # type the ratings dict is keyed by
+                            movie.rating = get_rating(movie.trakt_id)
+                            return movie
+
+                        movies = map(merge_rating, movies)
+
+                    for movie in movies:
+                        if upload_movies is not None:
+                            upload_movies.append(movie)
+                        movie_count += 1
+                        yield movie
+
+                watched_movies = stream_movies()
+                first_movie = next(watched_movies, None)
+
+                if first_movie is None:
+                    logger.info("No movies to sync")
+                    result['success'] = True
+                    result['movies_synced'] = 0
+                    return result
+
+                # Generate Letterboxd CSV
+                csv_path = self.letterboxd_csv.generate_csv(chain((first_movie,), watched_movies))
 
             # Auto-upload to Letterboxd if enabled
-            auto_upload = self.config.get('letterboxd', 'auto_upload', default=False)
             upload_result = None
 
-            if auto_upload and self.letterboxd_client:
+            if upload_movies is not None:
                 logger.info("Auto-upload enabled - uploading to Letterboxd")
                 try:
-                    upload_result = self.letterboxd_client.upload_movies(watched_movies)
+                    upload_result = self.letterboxd_client.upload_movies(upload_movies)
                     result['letterboxd_upload'] = upload_result
                     logger.info(f"Letterboxd upload: {upload_result['success']} successful, "
                               f"{upload_result['failed']} failed, {upload_result['skipped']} skipped")
@@ -198,10 +281,10 @@ class SyncManager:
             self.config.set_last_sync_time()
 
             result['success'] = True
-            result['movies_synced'] = len(watched_movies)
+            result['movies_synced'] = movie_count
             result['csv_path'] = csv_path
 
-            logger.info(f"Sync completed successfully: {len(watched_movies)} movies")
+            logger.info(f"Sync completed successfully: {movie_count} movies")
 
         except Exception as e:
             logger.error(f"Sync failed: {e}")
@@ -209,6 +292,17 @@ class SyncManager:
 
         return result
 
+    @staticmethod
+    def _no_movie_activity_since(activities: Optional[Dict], since: datetime) -> bool:
+        """Check whether Trakt's movie watch and rating activity both predate since"""
+        movies = (activities or {}).get('movies') or {}
+        watched_at = parse_dt(movies.get('watched_at'))
+        rated_at = parse_dt(movies.get('rated_at'))
+        if not watched_at or not rated_at:
+            # Unknown activity - fall through to a normal sync
+            return False
+        return watched_at <= since and rated_at <= since
+
     def _get_sync_start_date(self) -> Optional[datetime]:
         """Get the date to start syncing from"""
         # Check for last sync time (already parsed by config_manager)
@@ -304,8 +398,9 @@ class SyncManager:
             access_token, refresh_token = self.trakt_client.exchange_code(code)
 
             # Save tokens to config
-            self.config.set('trakt', 'access_token', value=access_token)
-            self.config.set('trakt', 'refresh_token', value=refresh_token)
+            with self.config:
+                self.config.set('trakt', 'access_token', value=access_token)
+                self.config.set('trakt', 'refresh_token', value=refresh_token)
 
             # Reinitialize Trakt client with new tokens
             self._initialize_trakt_client()
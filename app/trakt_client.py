@@ -1,21 +1,129 @@
 """Trakt.tv API client"""
 import logging
-from datetime import datetime, timezone
-from typing import List, Dict, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from operator import attrgetter
+from typing import Iterator, List, Dict, Optional
 import trakt
 from trakt import Trakt
+from app.config_manager import parse_dt
+from app.http_session import ConditionalGetAdapter
+from app.models import MovieRecord
+from app.rating_cache import RatingCache
 
 logger = logging.getLogger(__name__)
 
+TRAKT_API_URL = 'https://api.trakt.tv/'
+# Keep-alive connections kept open to the Trakt API
+TRAKT_POOL_SIZE = 4
+# Watch-history items per page (Trakt's maximum) and pages fetched at once;
+# one pooled connection is left for the ratings request a sync runs alongside
+HISTORY_PAGE_SIZE = 1000
+HISTORY_PAGE_WORKERS = TRAKT_POOL_SIZE - 1
+# Trakt allows 1000 API calls per 5 minutes per user
+TRAKT_RATE_LIMIT = 1000
+TRAKT_RATE_WINDOW = 300
+# Times a 429 response is waited out before it is handed back
+TRAKT_MAX_RATE_LIMIT_RETRIES = 3
+
+# Fields read from every watched-history item, fetched in one call
+_GET_MOVIE_FIELDS = attrgetter('title', 'year', 'keys', 'watched_at')
+# Fields read from every rated movie
+_GET_RATED_MOVIE = attrgetter('keys', 'rating')
+
+
+def _rating_pair(item):
+    """Return (trakt_id, rating value) for a rated trakt.py Movie"""
+    try:
+        keys, rating = _GET_RATED_MOVIE(item)
+    except AttributeError:
+        return None, None
+    trakt_id = dict(keys).get('trakt') if keys else None
+    # The score is wrapped in a trakt.py Rating object
+    return trakt_id, getattr(rating, 'value', rating)
+
+
+def _normalize_since(since) -> Optional[datetime]:
+    """Return since (datetime or ISO string) as a UTC-aware datetime, or None"""
+    if not since:
+        return None
+    since_utc = parse_dt(since)
+    if not since_utc:
+        logger.warning("Could not parse since parameter as datetime, ignoring")
+    return since_utc
+
+
+class _TokenBucket:
+    """Thread-safe token bucket pacing calls to a sustained rate"""
+
+    def __init__(self, capacity: float, refill_per_sec: float):
+        self.capacity = capacity
+        self.refill_per_sec = refill_per_sec
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until it has refilled if the bucket is empty"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_per_sec)
+            self._updated = now
+            # Reserve the token even if it isn't there yet, so concurrent
+            # callers queue up behind each other instead of racing
+            self._tokens -= 1
+            wait = -self._tokens / self.refill_per_sec if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+def _retry_after(response) -> float:
+    """Seconds to wait according to a 429 response's Retry-After header"""
+    try:
+        return max(1.0, float(response.headers.get('Retry-After', 1)))
+    except ValueError:
+        return 1.0
+
+
+class _TraktAdapter(ConditionalGetAdapter):
+    """
+    ConditionalGetAdapter that keeps every Trakt call within the API rate limit
+
+    Requests are paced by a token bucket so bursts (parallel history pages)
+    slow down before Trakt starts refusing them; a 429 that still gets
+    through is waited out as long as its Retry-After header asks.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.bucket = _TokenBucket(TRAKT_RATE_LIMIT, TRAKT_RATE_LIMIT / TRAKT_RATE_WINDOW)
+
+    def send(self, request, **kwargs):
+        for attempt in range(TRAKT_MAX_RATE_LIMIT_RETRIES + 1):
+            self.bucket.acquire()
+            response = super().send(request, **kwargs)
+            if response.status_code != 429 or attempt == TRAKT_MAX_RATE_LIMIT_RETRIES:
+                return response
+
+            delay = _retry_after(response)
+            logger.warning(f"Trakt rate limit reached - retrying in {delay:.0f}s")
+            response.close()
+            time.sleep(delay)
+
 
 class TraktClient:
     """Client for interacting with Trakt.tv API"""
 
-    def __init__(self, client_id, client_secret, access_token=None, refresh_token=None):
+    def __init__(self, client_id, client_secret, access_token=None, refresh_token=None,
+                 ratings_cache_path=None):
         self.client_id = client_id
         self.client_secret = client_secret
         self.access_token = access_token
         self.refresh_token = refresh_token
+        # Ratings are reused across syncs until Trakt reports a new rating
+        self.rating_cache = RatingCache(ratings_cache_path) if ratings_cache_path else None
         self._configure_trakt()
 
     def _configure_trakt(self):
@@ -32,6 +140,18 @@ class TraktClient:
             timeout=30
         )
 
+        # Revalidate repeat GETs (history/ratings pages) with ETags so
+        # unchanged pages come back as bodiless 304s, and pace requests to the
+        # rate limit (trakt.py itself only retries 5xx). Everything goes to
+        # one host, so keep a single pool with enough keep-alive connections
+        # for the requests a sync runs concurrently.
+        session = Trakt.http.session
+        if session is not None and not isinstance(session.get_adapter(TRAKT_API_URL), _TraktAdapter):
+            session.mount(TRAKT_API_URL, _TraktAdapter(
+                pool_connections=1,
+                pool_maxsize=TRAKT_POOL_SIZE
+            ))
+
         # Set OAuth tokens if available
         if self.access_token:
             # Properly configure OAuth with all required fields
@@ -79,7 +199,7 @@ class TraktClient:
             logger.error(f"Error exchanging code: {e}")
             raise
 
-    def get_watched_movies(self, since: Optional[datetime] = None) -> List[Dict]:
+    def get_watched_movies(self, since: Optional[datetime] = None) -> List[MovieRecord]:
         """
         Get list of watched movies
 
@@ -87,119 +207,163 @@ class TraktClient:
             since: Only get movies watched after this datetime
 
         Returns:
-            List of movie dictionaries with watch history
+            List of movie records with watch history
+        """
+        movies_list = list(self.iter_watched_movies(since=since))
+        logger.info(f"Retrieved {len(movies_list)} watched movies")
+        return movies_list
+
+    def iter_watched_movies(self, since: Optional[datetime] = None) -> Iterator[MovieRecord]:
+        """
+        Stream watched movies
+
+        Movies are yielded as history items are extracted, so callers can
+        write them out without holding the whole history in memory.
+
+        Args:
+            since: Only get movies watched after this datetime
+
+        Yields:
+            Movie records with watch history
         """
         try:
             logger.info("Fetching watched movies from Trakt")
 
-            # Convert since to ISO format for Trakt API if provided
-            start_at = None
-            if since:
-                # Ensure since is a datetime object (defensive check)
-                if isinstance(since, str):
-                    # Parse string to datetime if needed
-                    from app.config_manager import parse_dt
-                    since = parse_dt(since)
-                    if not since:
-                        logger.warning("Could not parse since parameter as datetime, ignoring")
-                        since = None
-
-                if since:
-                    # Ensure UTC timezone
-                    if since.tzinfo:
-                        since_utc = since.astimezone(timezone.utc)
-                    else:
-                        since_utc = since.replace(tzinfo=timezone.utc)
-
-                    # Pass datetime object directly (trakt.py v4.4.0 expects datetime, not string)
-                    start_at = since_utc
-                    logger.info(f"Syncing movies since: {since_utc.isoformat(timespec='seconds').replace('+00:00', 'Z')}")
-
-            # Get watched movies with history
-            # Use extended='full' to get all IDs (tmdb, imdb, etc.)
-            watched = Trakt['sync/history'].movies(
+            # Pass datetime object directly (trakt.py v4.4.0 expects datetime, not string)
+            start_at = _normalize_since(since)
+            if start_at and logger.isEnabledFor(logging.INFO):
+                logger.info(f"Syncing movies since: {start_at.isoformat(timespec='seconds').replace('+00:00', 'Z')}")
+
+            # Get watched movies with history. The default (min) payload already
+            # carries every ID (trakt, imdb, tmdb), which is all we read.
+            # trakt.py resolves the page count up front; the pages themselves
+            # are fetched in parallel below.
+            pages = Trakt['sync/history'].movies(
                 start_at=start_at,
-                extended='full'
+                pagination=True,
+                per_page=HISTORY_PAGE_SIZE,
+                exceptions=True
             )
 
-            movies_list = []
-            for item in watched:
-                movie_data = self._extract_movie_data(item)
-                if movie_data:
-                    movies_list.append(movie_data)
-
-            logger.info(f"Retrieved {len(movies_list)} watched movies")
-            return movies_list
+            # map/filter run the per-item loop in C; unusable items extract to None
+            yield from filter(None, map(self._extract_movie_data, self._iter_history_pages(pages)))
 
         except Exception as e:
             logger.error(f"Error fetching watched movies: {e}")
             raise
 
-    def get_movie_ratings(self) -> Dict[str, float]:
+    def _iter_history_pages(self, pages) -> Iterator:
+        """
+        Fetch every page of a paginated history request concurrently
+
+        Args:
+            pages: trakt.py PaginationIterator for the history request
+
+        Yields:
+            History items, in page order
+        """
+        total_pages = pages.total_pages or 1
+        logger.debug(f"Fetching {total_pages} page(s) of Trakt history")
+
+        with ThreadPoolExecutor(max_workers=min(HISTORY_PAGE_WORKERS, total_pages)) as executor:
+            # map() hands back pages in order while later ones are still loading
+            for page, items in enumerate(executor.map(pages.get, range(1, total_pages + 1)), 1):
+                if items is None:
+                    # Don't let a partial history pass for a complete sync
+                    raise RuntimeError(f"Could not fetch Trakt history page {page}")
+                yield from items
+
+    def get_last_activities(self) -> Optional[Dict]:
+        """
+        Get the account's last activity timestamps
+
+        Returns:
+            The /sync/last_activities payload, or None if it is unavailable
+        """
+        try:
+            activities = Trakt['sync'].last_activities()
+            if isinstance(activities, dict):
+                return activities
+        except Exception as e:
+            logger.warning(f"Could not fetch Trakt last activities: {e}")
+        return None
+
+    def get_movie_ratings(self, activities: Optional[Dict] = None) -> Dict[str, float]:
         """
         Get user's movie ratings
 
+        When a rating cache is configured, the full ratings list is only
+        downloaded if Trakt's movies.rated_at activity has moved since the
+        cache was written.
+
+        Args:
+            activities: Already fetched last activities payload (fetched
+                here if needed and not given)
+
         Returns:
             Dictionary mapping movie IDs to ratings
         """
         try:
+            rated_at = None
+            if self.rating_cache:
+                activities = activities or self.get_last_activities() or {}
+                rated_at = (activities.get('movies') or {}).get('rated_at')
+                cached, cached_rated_at = self.rating_cache.load()
+                if rated_at and cached is not None and cached_rated_at == rated_at:
+                    logger.info(f"Ratings unchanged since {rated_at} - using {len(cached)} cached ratings")
+                    return cached
+
             logger.info("Fetching movie ratings from Trakt")
             ratings = Trakt['sync/ratings'].movies()
 
-            ratings_dict = {}
-            for item in ratings:
-                if hasattr(item, 'movie') and item.movie:
-                    trakt_id = item.movie.ids.get('trakt')
-                    rating = item.rating
-                    if trakt_id and rating:
-                        ratings_dict[str(trakt_id)] = rating
+            # trakt.py maps the response to {pk: Movie}; str keys match history
+            # IDs and survive the JSON cache
+            items = ratings.values() if isinstance(ratings, dict) else ratings
+            ratings_dict = {
+                str(trakt_id): rating
+                for trakt_id, rating in map(_rating_pair, items)
+                if trakt_id and rating
+            }
 
             logger.info(f"Retrieved {len(ratings_dict)} movie ratings")
+
+            if self.rating_cache and rated_at:
+                self.rating_cache.save(ratings_dict, rated_at)
+
             return ratings_dict
 
         except Exception as e:
             logger.error(f"Error fetching ratings: {e}")
             return {}
 
-    def _extract_movie_data(self, history_item) -> Optional[Dict]:
+    def _extract_movie_data(self, history_item) -> Optional[MovieRecord]:
         """Extract movie data from history item"""
         try:
-            movie = history_item.movie if hasattr(history_item, 'movie') else history_item
-            watched_at = history_item.watched_at if hasattr(history_item, 'watched_at') else None
-
-            if not movie:
-                return None
-
-            # Extract IDs - trakt.py v4.4.0 uses 'keys' which returns a list of tuples
-            keys_list = movie.keys if hasattr(movie, 'keys') else None
-
-            movie_title = movie.title if hasattr(movie, 'title') else 'Unknown'
-
-            # Convert list of tuples to dict
-            trakt_id = None
-            imdb_id = None
-            tmdb_id = None
-
-            if keys_list:
-                # keys is a list of tuples like [('imdb', 'tt123'), ('tmdb', '456'), ...]
-                # Convert to dict for easy access
-                ids = dict(keys_list) if isinstance(keys_list, list) else {}
-
-                trakt_id = ids.get('trakt')
-                imdb_id = ids.get('imdb')
-                tmdb_id = ids.get('tmdb')
-
-            logger.debug(f"Extracted IDs for '{movie_title}': trakt={trakt_id}, imdb={imdb_id}, tmdb={tmdb_id}")
-
-            return {
-                'title': movie_title,
-                'year': movie.year if hasattr(movie, 'year') else None,
-                'trakt_id': trakt_id,
-                'imdb_id': imdb_id,
-                'tmdb_id': tmdb_id,
-                'watched_at': watched_at,
-                'rating': None  # Will be populated separately
-            }
+            try:
+                # trakt.py history items are Movie objects carrying watched_at
+                title, year, keys_list, watched_at = _GET_MOVIE_FIELDS(history_item)
+            except AttributeError:
+                # Wrapped item with the movie under .movie
+                movie = getattr(history_item, 'movie', None)
+                if not movie:
+                    return None
+                title = getattr(movie, 'title', 'Unknown')
+                year = getattr(movie, 'year', None)
+                keys_list = getattr(movie, 'keys', None)
+                watched_at = getattr(history_item, 'watched_at', None)
+
+            # Extract IDs - trakt.py v4.4.0 uses 'keys', a list of tuples like
+            # [('imdb', 'tt123'), ('tmdb', '456'), ...]
+            ids = dict(keys_list) if isinstance(keys_list, list) else {}
+            trakt_id = ids.get('trakt')
+            imdb_id = ids.get('imdb')
+            tmdb_id = ids.get('tmdb')
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Extracted IDs for '{title}': trakt={trakt_id}, imdb={imdb_id}, tmdb={tmdb_id}")
+
+            # Rating is populated separately
+            return MovieRecord(title, year, trakt_id, imdb_id, tmdb_id, watched_at)
         except Exception as e:
             logger.error(f"Error extracting movie data: {e}", exc_info=True)
             return None
@@ -207,16 +371,15 @@ class TraktClient:
     def test_connection(self) -> bool:
         """Test if the Trakt API connection is working"""
         try:
-            # Try to fetch watched history (just check if API responds)
-            # Get the generator/iterator but don't fully consume it
-            history = Trakt['sync/history'].movies()
-            # Try to get first item to verify connection works
-            try:
-                next(iter(history))
-            except StopIteration:
-                # Empty history is fine, connection works
-                pass
-            logger.info("Trakt API connection test successful")
+            # /users/settings is a small constant-size authenticated call,
+            # unlike paging into the watch history
+            settings = Trakt['users/settings'].get()
+            if not isinstance(settings, dict):
+                logger.error("Trakt API connection test failed: no settings returned")
+                return False
+
+            slug = ((settings.get('user') or {}).get('ids') or {}).get('slug')
+            logger.info(f"Trakt API connection test successful (user: {slug or 'unknown'})")
             return True
         except Exception as e:
             logger.error(f"Trakt API connection test failed: {e}")
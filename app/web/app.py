@@ -1,25 +1,180 @@
 """Flask web application"""
+import hmac
 import logging
-from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for, flash, session
+from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for, flash, session, make_response
+from flask.json.provider import DefaultJSONProvider
 from functools import wraps
-from datetime import datetime
+from jinja2 import FileSystemBytecodeCache
+from datetime import date
 import os
+import secrets
+import threading
+import time
 import app
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+
 logger = logging.getLogger(__name__)
 
+# Seconds dashboard data is reused between requests; Trakt reachability
+# rarely flips and costs an API call, so it is kept longer
+STATS_CACHE_TTL = 15
+CONNECTION_CACHE_TTL = 60
+# Seconds a browser may reuse a downloaded export without revalidating
+EXPORT_MAX_AGE = 300
+
+
+class JSONProvider(DefaultJSONProvider):
+    """
+    JSON provider backed by orjson when it is installed
+
+    Dates and datetimes are written as ISO 8601 on both paths (Flask's
+    default would use HTTP date format), so views can hand them to
+    jsonify() as-is.
+    """
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, date):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        # orjson writes date/datetime as ISO 8601 natively
+        option = 0
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=self.default, option=option).decode()
+        except TypeError:
+            # e.g. non-str dict keys, which the stdlib encoder coerces
+            return super().dumps(obj, **kwargs)
+
+
+def _if_none_match(etag):
+    """
+    Return the If-None-Match tag that refers to etag, or None
+
+    Flask-Compress appends the encoding to the ETag of a compressed
+    response ("<etag>:gzip"), so browsers revalidate with that variant.
+    """
+    if_none_match = request.if_none_match
+    if if_none_match.star_tag:
+        return etag
+    for tag in if_none_match:
+        if tag.partition(':')[0] == etag:
+            return tag
+    return None
+
+
+def _load_secret_key(path):
+    """
+    Read the session signing key from path, generating it on first use
+
+    The key is created with owner-only permissions. If it can't be
+    written, a key for this process only is returned.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            secret_key = f.read().strip()
+        if secret_key:
+            return secret_key
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Could not read secret key from {path}: {e}")
+
+    secret_key = secrets.token_hex(32)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(secret_key)
+        logger.info(f"Generated session secret key at {path}")
+    except Exception as e:
+        logger.warning(f"Could not save secret key to {path} - sessions won't survive a restart: {e}")
+    return secret_key
+
+
+class _TTLCache:
+    """Thread-safe cache of computed values that expire after a TTL"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, ttl, compute):
+        """Return the value cached under key, calling compute() if it is missing or stale"""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and time.monotonic() - entry[0] < ttl:
+            return entry[1]
+
+        value = compute()
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+        return value
+
+    def clear(self):
+        """Drop every cached value"""
+        with self._lock:
+            self._entries.clear()
+
 
 def create_app(config_manager, sync_manager, scheduler):
     """Create and configure Flask application"""
 
-    flask_app = Flask(__name__)
-    flask_app.secret_key = os.urandom(24)
+    # Styles and scripts are inlined in the templates; there is no static
+    # folder to serve. The root path is given so Flask needn't look it up.
+    flask_app = Flask(__name__, root_path=os.path.dirname(os.path.abspath(__file__)),
+                      template_folder='templates', static_folder=None)
+    flask_app.json = JSONProvider(flask_app)
+    # br/gzip-compress HTML and JSON responses above 500 bytes. CSV exports
+    # are left alone so send_file's ETags and byte ranges stay valid.
+    if Compress is not None:
+        flask_app.config['COMPRESS_MIMETYPES'] = ['text/html', 'application/json']
+        Compress(flask_app)
+    # Reuse compiled templates across restarts (per-user dir under the temp dir)
+    flask_app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
+    # Sessions are signed with a persistent key so logins survive restarts:
+    # web.secret_key if set, else one generated into the data directory (the
+    # config itself is never written here, so env-provided secrets stay off disk)
+    secret_key = config_manager.get('web', 'secret_key')
+    if not secret_key:
+        data_dir = os.path.dirname(config_manager.get('sync', 'last_sync_file'))
+        secret_key = _load_secret_key(os.path.join(data_dir, 'secret_key'))
+    flask_app.secret_key = secret_key
 
     # Store managers in app config
     flask_app.config['CONFIG_MANAGER'] = config_manager
     flask_app.config['SYNC_MANAGER'] = sync_manager
     flask_app.config['SCHEDULER'] = scheduler
 
+    # Exports are written to the directory configured at startup (see
+    # SyncManager), so it is resolved once for the download path check
+    export_dir = os.path.realpath(config_manager.get('sync', 'export_path'))
+
+    # Collapses dashboard refreshes onto one stats read / connection test;
+    # cleared by every request that changes what they report
+    cache = _TTLCache()
+
+    def get_sync_stats():
+        return cache.get('stats', STATS_CACHE_TTL, sync_manager.get_sync_stats)
+
+    def test_connection():
+        return cache.get('connection', CONNECTION_CACHE_TTL, sync_manager.test_connection)
+
     # Make version available in all templates
     @flask_app.context_processor
     def inject_version():
@@ -41,7 +196,8 @@ def create_app(config_manager, sync_manager, scheduler):
             password = request.form.get('password')
             admin_password = config_manager.get('web', 'admin_password', default='changeme')
 
-            if password == admin_password:
+            # Constant-time compare so response timing doesn't leak the password
+            if password and hmac.compare_digest(password.encode('utf-8'), str(admin_password).encode('utf-8')):
                 session['authenticated'] = True
                 flash('Login successful!', 'success')
                 return redirect(url_for('index'))
@@ -62,13 +218,30 @@ def create_app(config_manager, sync_manager, scheduler):
     def index():
         """Main dashboard"""
         try:
-            stats = sync_manager.get_sync_stats()
+            # The rendered page only varies with the Trakt authorization state
+            # (stats are fetched by its scripts), so an unchanged dashboard is
+            # answered with a 304 before anything is gathered or rendered.
+            # Pending flash messages are shown once, so such pages get no ETag.
+            authorized = bool(config_manager.get('trakt', 'access_token'))
+            etag = f"{app.__version__}-{int(authorized)}"
+            cacheable = not session.get('_flashes')
+            matched = _if_none_match(etag) if cacheable else None
+            if matched:
+                response = flask_app.response_class(status=304)
+                response.set_etag(matched)
+                return response
+
+            stats = get_sync_stats()
             scheduler_status = scheduler.get_status()
 
-            return render_template('index.html',
-                                   stats=stats,
-                                   scheduler=scheduler_status,
-                                   config=config_manager.config)
+            response = make_response(render_template('index.html',
+                                                     stats=stats,
+                                                     scheduler=scheduler_status,
+                                                     config=config_manager.config))
+            if cacheable:
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'private, no-cache'
+            return response
         except Exception as e:
             logger.error(f"Error loading dashboard: {e}")
             return render_template('error.html', error=str(e)), 500
@@ -82,6 +255,10 @@ def create_app(config_manager, sync_manager, scheduler):
             full_sync = data.get('full_sync', False)
 
             result = scheduler.trigger_manual_sync(full_sync=full_sync)
+            if result.get('in_progress'):
+                return jsonify(result), 429
+
+            cache.clear()
             return jsonify(result)
 
         except Exception as e:
@@ -92,11 +269,10 @@ def create_app(config_manager, sync_manager, scheduler):
     def get_status():
         """Get current status (public endpoint for healthcheck)"""
         try:
-            # Basic health check - just verify the app is running
-            return jsonify({
-                'status': 'ok',
-                'timestamp': datetime.now().isoformat()
-            })
+            # Basic health check - just verify the app is running. Hit every
+            # few seconds, so the body is formatted directly, not via jsonify
+            body = b'{"status":"ok","timestamp":%.6f}\n' % time.time()
+            return flask_app.response_class(body, mimetype='application/json')
 
         except Exception as e:
             logger.error(f"Error getting status: {e}")
@@ -107,9 +283,9 @@ def create_app(config_manager, sync_manager, scheduler):
     def get_detailed_status():
         """Get detailed status (requires authentication)"""
         try:
-            stats = sync_manager.get_sync_stats()
+            stats = get_sync_stats()
             scheduler_status = scheduler.get_status()
-            connection_test = sync_manager.test_connection()
+            connection_test = test_connection()
 
             return jsonify({
                 'stats': stats,
@@ -126,15 +302,8 @@ def create_app(config_manager, sync_manager, scheduler):
     def list_exports():
         """List recent CSV exports"""
         try:
+            # Timestamps are epoch seconds; the dashboard formats them
             exports = sync_manager.letterboxd_csv.get_recent_exports(limit=20)
-
-            # Convert datetime objects to ISO format strings for JSON serialization
-            for export in exports:
-                if 'created' in export and isinstance(export['created'], datetime):
-                    export['created'] = export['created'].isoformat()
-                if 'modified' in export and isinstance(export['modified'], datetime):
-                    export['modified'] = export['modified'].isoformat()
-
             return jsonify({'exports': exports})
 
         except Exception as e:
@@ -146,17 +315,24 @@ def create_app(config_manager, sync_manager, scheduler):
     def download_export(filename):
         """Download CSV export"""
         try:
-            export_path = config_manager.get('sync', 'export_path')
-            filepath = os.path.join(export_path, filename)
+            filepath = os.path.realpath(os.path.join(export_dir, filename))
 
-            # Security check - ensure file is in export directory
-            if not os.path.abspath(filepath).startswith(os.path.abspath(export_path)):
+            # Security check - ensure file is in export directory (after
+            # resolving symlinks)
+            if not filepath.startswith(export_dir + os.sep):
                 return jsonify({'error': 'Invalid file path'}), 403
 
             if not os.path.exists(filepath):
                 return jsonify({'error': 'File not found'}), 404
 
-            return send_file(filepath, as_attachment=True)
+            # Conditional (ETag/Last-Modified -> 304) and Range requests are
+            # answered by send_file; exports never change once written
+            response = send_file(filepath, as_attachment=True, conditional=True,
+                                 etag=True, max_age=EXPORT_MAX_AGE)
+            # Exports sit behind the login, so keep them out of shared caches
+            response.cache_control.public = False
+            response.cache_control.private = True
+            return response
 
         except Exception as e:
             logger.error(f"Error downloading export: {e}")
@@ -168,32 +344,25 @@ def create_app(config_manager, sync_manager, scheduler):
         """Get or update configuration"""
         if request.method == 'GET':
             # Return config (without sensitive data)
-            safe_config = config_manager.config.copy()
-            if 'trakt' in safe_config:
-                safe_config['trakt'].pop('client_secret', None)
-                safe_config['trakt'].pop('access_token', None)
-                safe_config['trakt'].pop('refresh_token', None)
-            if 'letterboxd' in safe_config:
-                safe_config['letterboxd'].pop('password', None)
-            if 'web' in safe_config:
-                safe_config['web'].pop('admin_password', None)
-
-            return jsonify(safe_config)
+            return jsonify(config_manager.safe_config)
 
         elif request.method == 'POST':
             try:
                 data = request.get_json()
 
-                # Update specific config values
-                if 'sync' in data and 'schedule' in data['sync']:
-                    scheduler.update_schedule(data['sync']['schedule'])
+                # Apply all updates, then write the config file once
+                with config_manager:
+                    # Update specific config values
+                    if 'sync' in data and 'schedule' in data['sync']:
+                        scheduler.update_schedule(data['sync']['schedule'])
 
-                # Save other config updates
-                for key, value in data.items():
-                    if key in config_manager.config:
-                        for subkey, subvalue in value.items():
-                            config_manager.set(key, subkey, value=subvalue)
+                    # Save other config updates
+                    config_manager.update({
+                        key: value for key, value in data.items()
+                        if key in config_manager.config
+                    })
 
+                cache.clear()
                 return jsonify({'success': True, 'message': 'Configuration updated'})
 
             except Exception as e:
@@ -224,6 +393,7 @@ def create_app(config_manager, sync_manager, scheduler):
                 return jsonify({'error': 'Authorization code required'}), 400
 
             sync_manager.complete_trakt_auth(code)
+            cache.clear()
             return jsonify({'success': True, 'message': 'Trakt authentication completed'})
 
         except Exception as e:
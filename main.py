@@ -1,8 +1,10 @@
 """Main entry point for Trakt to Letterboxd Sync"""
+import atexit
 import os
+import queue
 import sys
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
 
 from app.config_manager import ConfigManager
@@ -34,7 +36,7 @@ def setup_logging(config_manager):
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     console_handler.setFormatter(console_formatter)
-    root_logger.addHandler(console_handler)
+    handlers = [console_handler]
 
     # File handler with rotation
     try:
@@ -49,10 +51,18 @@ def setup_logging(config_manager):
             datefmt='%Y-%m-%d %H:%M:%S'
         )
         file_handler.setFormatter(file_formatter)
-        root_logger.addHandler(file_handler)
+        handlers.append(file_handler)
     except Exception as e:
         print(f"Warning: Could not set up file logging: {e}")
 
+    # Request and sync threads only enqueue records; a background thread
+    # does the console/file writes (and rotation)
+    log_queue = queue.SimpleQueue()
+    root_logger.addHandler(QueueHandler(log_queue))
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
     logging.info("Logging configured")
 
 
@@ -100,12 +110,20 @@ def main():
         print(f"Default password: changeme")
         print("=" * 60 + "\n")
 
-        app.run(
-            host=host,
-            port=port,
-            debug=False,
-            threaded=True
-        )
+        try:
+            from waitress import serve
+        except ImportError:
+            logger.warning("waitress not installed - falling back to the Flask development server")
+            app.run(
+                host=host,
+                port=port,
+                debug=False,
+                threaded=True
+            )
+        else:
+            # A single process keeps one scheduler and one session secret;
+            # waitress serves requests from a thread pool
+            serve(app, host=host, port=port, threads=web_config.get('threads', 8))
 
     except KeyboardInterrupt:
         logger.info("Shutting down...")